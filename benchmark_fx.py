@@ -0,0 +1,61 @@
+"""
+Compare the batched FX transform (data_manager.fx_transform) with the
+per-window loop it replaced, for typical array sizes.
+
+Run with: python benchmark_fx.py
+"""
+import time
+import numpy as np
+from annotate.data_manager import fx_transform
+
+WINDOW_S = 60.0
+CASES = [  # (nx, fs, win_s)
+    (1000, 200.0, 2.0),
+    (2000, 200.0, 2.0),
+    (2000, 200.0, 1.0),
+    (2000, 500.0, 2.0),
+    (4000, 200.0, 5.0),
+]
+OVERLAPS = [0, 50]   # % overlap between windows
+REPEATS = 3
+
+
+def fx_loop(amp, win_samples, step_samples):
+    """Per-window loop as previously used in FXHandle.update_data()."""
+    slices = []
+    for start in range(0, amp.shape[1] - win_samples + 1, step_samples):
+        segment = amp[:, start:start+win_samples]
+        F = np.fft.rfft(segment, axis=1)
+        slices.append(np.abs(F))
+    return np.stack(slices, axis=0)
+
+
+def best_time(fn, *args):
+    times = []
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'nx':>6} {'fs':>6} {'win_s':>6} {'ovl%':>5} {'nwin':>5} "
+          f"{'loop (s)':>10} {'batched (s)':>12} {'speedup':>8}")
+    for nx, fs, win_s in CASES:
+        amp = rng.standard_normal((nx, int(WINDOW_S * fs))).astype(np.float32)
+        win_samples = int(win_s * fs)
+        for overlap in OVERLAPS:
+            step_samples = max(1, win_samples - int(win_samples * overlap / 100))
+            starts = np.arange(0, amp.shape[1] - win_samples + 1, step_samples)
+            out = np.empty((len(starts), nx, win_samples // 2 + 1), dtype=amp.dtype)
+
+            ref = fx_loop(amp, win_samples, step_samples)
+            np.testing.assert_allclose(fx_transform(amp, win_samples, starts, out=out), ref,
+                                       rtol=1e-3, atol=1e-3 * ref.max())
+
+            t_loop = best_time(fx_loop, amp, win_samples, step_samples)
+            t_batch = best_time(lambda: fx_transform(amp, win_samples, starts, out=out))
+            print(f"{nx:>6} {fs:>6.0f} {win_s:>6.1f} {overlap:>5} {len(starts):>5} "
+                  f"{t_loop:>10.3f} {t_batch:>12.3f} {t_loop / t_batch:>7.1f}x")
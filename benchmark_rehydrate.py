@@ -0,0 +1,63 @@
+"""
+Compare per-file rehydration with the original data_io.rehydrate() against a
+rehydration plan (data_io.SparseRehydrator) built once and reused, as in a
+batch run over many files of one dataset.
+
+Run with: python benchmark_rehydrate.py
+"""
+import time
+import numpy as np
+from annotate import data_io as io
+
+CASES = [  # (nx, ns, fraction of f-k coefficients kept)
+    (1000, 6000, 0.05),
+    (2000, 6000, 0.05),
+    (2000, 6000, 0.20),
+]
+N_FILES = 5
+
+
+def make_mask(rng, nx, ns, fraction):
+    """Band-limited mask like the preprocessing produces: a band of frequency columns."""
+    nf = ns // 2 + 1
+    mask = np.zeros((nx, nf), dtype=bool)
+    band = slice(int(nf * 0.02), int(nf * 0.02) + max(1, int(nf * fraction * 2)))
+    mask[:, band] = rng.random((nx, band.stop - band.start)) < 0.5
+    return mask
+
+
+def per_file(files, mask, shape):
+    for fk in files:
+        io.rehydrate(fk, mask, shape) * 1e9
+
+
+def with_plan(files, mask, shape, dtype):
+    plan = io.SparseRehydrator(mask, shape, scale=1e9)
+    for fk in files:
+        plan.apply(fk, dtype=dtype)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'nx':>6} {'ns':>6} {'kept':>5} {'per file (s)':>13} "
+          f"{'plan f64 (s)':>13} {'plan f32 (s)':>13}")
+    for nx, ns, fraction in CASES:
+        mask = make_mask(rng, nx, ns, fraction)
+        n = int(mask.sum())
+        files = [(rng.standard_normal(n) + 1j * rng.standard_normal(n)).astype(np.complex64) * 1e-9
+                 for _ in range(N_FILES)]
+        shape = (nx, ns)
+
+        plan = io.SparseRehydrator(mask, shape, scale=1e9)
+        np.testing.assert_allclose(plan.apply(files[0]), io.rehydrate(files[0], mask, shape) * 1e9,
+                                   atol=1e-9)
+
+        t0 = time.perf_counter()
+        per_file(files, mask, shape)
+        t1 = time.perf_counter()
+        with_plan(files, mask, shape, np.float64)
+        t2 = time.perf_counter()
+        with_plan(files, mask, shape, np.float32)
+        t3 = time.perf_counter()
+        print(f"{nx:>6} {ns:>6} {fraction:>5.2f} {(t1 - t0) / N_FILES:>13.3f} "
+              f"{(t2 - t1) / N_FILES:>13.3f} {(t3 - t2) / N_FILES:>13.3f}")
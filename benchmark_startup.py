@@ -0,0 +1,64 @@
+"""
+Measure GUI start-up cost: import time of annotate.main (entry point
+annotate.main:run) and time until the main window is constructed, each in a
+fresh interpreter. Also lists heavy scientific packages that were imported
+before any dataset is opened (there should be none).
+
+Run with: python benchmark_startup.py [-n REPEATS]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ['matplotlib', 'scipy', 'h5py']
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import annotate.main
+t_import = time.perf_counter() - t0
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+t1 = time.perf_counter()
+win = annotate.main.MainWindow()
+t_window = time.perf_counter() - t1
+heavy = [m for m in %r if m in sys.modules]
+print(json.dumps({'import_s': t_import, 'window_s': t_window, 'heavy': heavy}))
+""" % (HEAVY_MODULES,)
+
+
+def run_probe():
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    out = subprocess.run([sys.executable, '-c', PROBE], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def slowest_imports(n=10):
+    """Top cumulative entries of `python -X importtime -c 'import annotate.main'`."""
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import annotate.main'],
+                         check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_probe() for _ in range(args.repeats)]
+    import_s = min(r['import_s'] for r in results)
+    window_s = min(r['window_s'] for r in results)
+    print(f"import annotate.main : {import_s * 1000:8.1f} ms (best of {args.repeats})")
+    print(f"MainWindow()         : {window_s * 1000:8.1f} ms")
+    print(f"heavy modules loaded : {', '.join(results[0]['heavy']) or 'none'}")
+    print("\nslowest imports (cumulative):")
+    for us, name in slowest_imports():
+        print(f"{us / 1000:8.1f} ms {name}")
@@ -0,0 +1,107 @@
+"""
+Check that windows rehydrated by the worker processes go through the on-disk
+cache (DiskFileCache): the first load writes every file to it, and later loads
+of the same window, in this session's workers or in a new session, read the
+cache instead of the dehydrated files. Runs on the synthetic dataset of
+check_precision.py; the dehydrated files are zeroed after the first load, so
+any load that still reads them fails or differs. Finally a file is touched, as
+if preprocessed again, and must no longer be found in the cache.
+
+Run with: python check_disk_cache.py
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from annotate.data_io import DiskFileCache
+from annotate.data_manager import PreprocessedDataManager
+from annotate.rehydrate_pool import ParallelRehydrator
+from check_precision import write_dataset
+
+N_FILES = 4
+WINDOW_S = 90.0  # three 30 s files: enough for the parallel path
+
+
+def new_manager(cache_dir, workers=2):
+    dm = PreprocessedDataManager()
+    dm.disk_cache = DiskFileCache(cache_dir, 1024**3)
+    dm.parallel_rehydrator.shutdown()
+    dm.parallel_rehydrator = ParallelRehydrator(workers=workers)
+    dm.apply_user_settings({'duration_s': WINDOW_S, 'precision': 'float32'})
+    return dm
+
+
+def wait_until_ready(rehydrator, timeout_s=120):
+    rehydrator.start()
+    deadline = time.monotonic() + timeout_s
+    while not rehydrator.ready():
+        if time.monotonic() > deadline:
+            raise RuntimeError("worker processes did not start")
+        time.sleep(0.1)
+
+
+def zero_file(path):
+    """Overwrite a file with zeros, keeping its size and mtime (part of the disk cache key)."""
+    st = os.stat(path)
+    with open(path, 'r+b') as f:
+        f.write(bytes(st.st_size))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        first_file = write_dataset(directory, nx=200, n_files=N_FILES)
+        cache_dir = os.path.join(directory, 'cache')
+        dm = new_manager(cache_dir)
+        try:
+            wait_until_ready(dm.parallel_rehydrator)
+            dm.new_file_selected(first_file)
+            options = dm._load_options()
+            parallel = all(dm._file_cache_key(idx, options) not in dm.file_cache
+                           for idx in dm.loaded_files_indices)
+            first_amp = np.array(dm.loaded_data['amp'])
+            entries = sum(name.endswith('.npy') for name in os.listdir(cache_dir))
+            dm._wait_for_prefetch()
+
+            for idx in range(N_FILES):
+                zero_file(dm.file_path(idx))
+
+            # the same workers, given the disk cache keys of the window's files
+            pieces, column = [], 0
+            for idx, local, n in dm.loaded_data['segments']:
+                filepath = dm.file_path(idx)
+                pieces.append((filepath, local, n, column, dm._disk_cache_key(filepath, **options)))
+                column += n
+            targets = dm.parallel_rehydrator.rehydrate_pieces(
+                dm.settings_filepath, pieces, options, first_amp.shape[0], first_amp.shape[1],
+                disk_cache=dm.disk_cache)
+            try:
+                worker_error = float(np.max(np.abs(targets['amp'].array - first_amp)))
+            finally:
+                for target in targets.values():
+                    target.unlink()
+        finally:
+            dm.close()
+
+        # a new session with the same cache directory
+        dm = new_manager(cache_dir)
+        try:
+            wait_until_ready(dm.parallel_rehydrator)
+            dm.new_file_selected(first_file)
+            session_error = float(np.max(np.abs(dm.loaded_data['amp'] - first_amp)))
+            dm._wait_for_prefetch()
+            st = os.stat(first_file)  # rewritten in place: same name and size, a later mtime
+            os.utime(first_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            rewritten_miss = not dm._in_disk_cache(0, dm._load_options())
+        finally:
+            dm.close()
+
+    print(f"first load     : {'parallel' if parallel else 'one by one'}, {entries} disk cache entries")
+    print(f"workers, again : max difference {worker_error:.2e}")
+    print(f"new session    : max difference {session_error:.2e}")
+    print(f"rewritten file : {'miss' if rewritten_miss else 'stale hit'}")
+    ok = (parallel and entries >= 3 and worker_error == 0 and session_error == 0
+          and rewritten_miss)
+    print("disk cache OK" if ok else "parallel loads did not use the disk cache")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,66 @@
+"""
+Check that cached spectrogram rows follow the loaded window when Apply Changes
+reloads it with a different channel range or precision.
+
+The main window's Apply emits settings_changed (the spectrogram panel redraws
+its row from the old window) before the window is reloaded; a cache keyed on
+the new settings would keep serving that old row. Runs on the synthetic
+dataset of check_precision.py.
+
+Run with: python check_spectrogram_cache.py [--row 5]
+"""
+import argparse
+import sys
+import tempfile
+import numpy as np
+import scipy.signal as sp
+from annotate.data_manager import PreprocessedDataManager
+from check_precision import write_dataset
+
+
+def fresh_spectrogram(row, fs, nfft, percent_overlap):
+    """Spectrogram of one row computed directly, scaled as in spectrogram_magnitude."""
+    window = sp.windows.tukey(nfft, .25)
+    _, _, Sxx = sp.spectrogram(row.astype(np.float64), fs=fs, window=window, nperseg=nfft,
+                               noverlap=int(nfft * percent_overlap / 100),
+                               scaling='spectrum', mode='magnitude')
+    return Sxx * nfft / np.sqrt(np.sum(window**2))
+
+
+def apply(dm, row, **changes):
+    """Apply Changes as the main window does it, with the panel's redraw in between."""
+    dm.apply_user_settings(dict(dm.get_user_settings(), **changes))
+    dm.load_current_window(recompute_fx=True)
+    freqs, times, Sxx = dm.spectrogram_manager.calc_spectrogram(row)
+    fs = dm.h5settings['fs']
+    nfft, percent_overlap = dm.spectrogram_manager._params()
+    expected = fresh_spectrogram(dm.loaded_data['amp'][row], fs, nfft, percent_overlap)
+    return float(np.max(np.abs(Sxx - expected)) / np.max(np.abs(expected))), Sxx.dtype
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--row', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        first_file = write_dataset(directory, nx=200)
+        dm = PreprocessedDataManager()
+        # the spectrogram panel recomputes its last row on every settings change
+        dm.settings_changed.connect(lambda: dm.loaded_data['amp'] is not None and
+                                    dm.spectrogram_manager.calc_spectrogram(args.row))
+        dm.apply_user_settings({'duration_s': 30.0, 'nfft': 256, 'overlap': 75,
+                                'precision': 'float32'})
+        try:
+            dm.new_file_selected(first_file)
+            dm.spectrogram_manager.calc_spectrogram(args.row)
+            x_error, _ = apply(dm, args.row, x_min_m=100.0)
+            precision_error, dtype = apply(dm, args.row, precision='float64')
+        finally:
+            dm.close()
+
+    print(f"x_min_m 100 m  : max relative error {x_error:.2e}")
+    print(f"float64        : max relative error {precision_error:.2e}, spectrogram {dtype}")
+    ok = x_error < 1e-4 and precision_error < 1e-10 and dtype == np.float64
+    print("spectrogram cache OK" if ok else "spectrogram cache returned a row of the old window")
+    sys.exit(0 if ok else 1)
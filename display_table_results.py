@@ -1,7 +1,8 @@
 import pandas as pd
 import sqlite3
+from annotate.config import DEFAULT_SAVE_PATH
 
-db_path = r"C:\Users\ers334\Documents\databases\DAS_Annotations\A25.db"
+db_path = DEFAULT_SAVE_PATH
 conn = sqlite3.connect(db_path)
 
 query = """
@@ -1,28 +1,19 @@
 from annotate import data_io as io
-import sqlite3
+from annotate.config import DEFAULT_SAVE_PATH
+from annotate.data_manager import LabelSaver
 import os
 import numpy as np
 
 #=== CONFIG PATHS ===#
-db_path = r"C:\Users\ers334\Documents\databases\DAS_Annotations\A25.db"
+db_path = DEFAULT_SAVE_PATH
 root_path = "F:\\"
 
-# Connect to DB
-conn = sqlite3.connect(db_path)
+# Connect to DB. Opening it through LabelSaver applies the schema migrations,
+# which add fx_labels.source_file / start_time and the indexes if they are missing.
+conn = LabelSaver(db_path).conn
 cur = conn.cursor()
 
-#=== 1. Make sure fx_labels has `source_file` column ===#
-cur.execute("PRAGMA table_info(fx_labels)")
-columns_fx = [row[1] for row in cur.fetchall()]  # row[1] = column name
-
-if "source_file" not in columns_fx:
-    print("Adding 'source_file' column to fx_labels...")
-    cur.execute("ALTER TABLE fx_labels ADD COLUMN source_file TEXT")
-    conn.commit()  # Commit schema change before data changes
-else:
-    print("'source_file' column already exists in fx_labels.")
-
-#=== 2. Get all datasets from tx_labels ===#
+#=== 1. Get all datasets from tx_labels ===#
 datasets = [row[0] for row in cur.execute("SELECT DISTINCT dataset FROM tx_labels").fetchall()]
 
 for dataset in datasets:
@@ -31,14 +22,14 @@ for dataset in datasets:
     settings_filepath = os.path.join(dataset_filepath, 'settings.h5')
 
     settings = io.load_settings_preprocessed_h5(settings_filepath)
-    file_map = settings.get('file_map', {})
+    table = settings['file_map']
 
-    # Ensure file_map sorted by timestamp
-    sort_idx = np.argsort(file_map['timestamp'])
-    file_map['timestamp'] = np.array(file_map['timestamp'])[sort_idx]
-    file_map['filename'] = np.array(file_map['filename'])[sort_idx]
+    # Ensure file_map sorted by timestamp (sorted copies: settings are cached, read-only)
+    sort_idx = np.argsort(table['timestamp'])
+    file_map = {'timestamp': np.array(table['timestamp'])[sort_idx],
+                'filename': np.array(table['filename'])[sort_idx]}
 
-    #=== 3. Update tx_labels using apex_time ===#
+    #=== 2. Update tx_labels using apex_time ===#
     tx_rows = cur.execute("""
         SELECT id, apex_time FROM tx_labels
         WHERE dataset = ?
@@ -62,25 +53,32 @@ for dataset in datasets:
             WHERE id = ?
         """, (mapped_file, label_id))
 
-        #=== 4. Update fx_labels.source_file ===#
+        #=== 3. Update fx_labels.source_file (and start_time of older labels) ===#
         fx_rows = cur.execute("""
-            SELECT t FROM fx_labels
+            SELECT id, t, start_time FROM fx_labels
             WHERE dataset = ? AND tx_id = ?
         """, (dataset, label_id)).fetchall()
 
-        for (t,) in fx_rows:
-            if t >= 30:
-                mapped_file_fx = next_file if next_file is not None else mapped_file
+        for fx_id, t, start_time in fx_rows:
+            if start_time is not None:
+                # absolute slice start: the window may have started anywhere in a file
+                fx_idx = np.where(file_map['timestamp'] <= start_time)[0]
+                mapped_file_fx = file_map['filename'][fx_idx[-1]] if len(fx_idx) else mapped_file
             else:
-                mapped_file_fx = mapped_file
+                # older labels: the window started at the apex file, t is relative to it
+                if t >= 30:
+                    mapped_file_fx = next_file if next_file is not None else mapped_file
+                else:
+                    mapped_file_fx = mapped_file
+                start_time = float(file_map['timestamp'][file_idx]) + t
 
             cur.execute("""
                 UPDATE fx_labels
-                SET source_file = ?
-                WHERE dataset = ? AND tx_id = ? AND t = ?
-            """, (mapped_file_fx, dataset, label_id, t))
+                SET source_file = ?, start_time = ?
+                WHERE id = ?
+            """, (mapped_file_fx, start_time, fx_id))
 
-#=== 5. Commit everything ===#
+#=== 4. Commit everything ===#
 conn.commit()
 conn.close()
 
@@ -1,4 +1,4 @@
-import matplotlib.pyplot as plt
+import os
 import numpy as np
 from dataclasses import dataclass
 
@@ -7,9 +7,14 @@ from dataclasses import dataclass
 # -------------------------------------
 @dataclass
 class UserSettings: # control panel settings
-    start_time: str = ""
-    duration_s: float = 30.0    # duration of data shown in TX plot
+    start_time: str = ""        # UTC, "YYYY-MM-DD HH:MM:SS[.fff]"; empty = start of selected file
+    duration_s: float = 60.0    # duration of data shown in TX plot
+    nav_step_s: float = 30.0    # step of the < / > navigation buttons
+    x_min_m: float = 0.0        # first distance loaded
+    x_max_m: float = 0.0        # last distance loaded; 0 = end of cable
     fx_win_s: float = 2.0       # duration of each FX plot
+    fx_overlap: float = 0       # % overlap between consecutive FX plots
+    fx_mosaic: bool = False     # FX series as one mosaic image instead of separate plots
     nfft: int = 256             # FFT length used for spectrogram calculation
     overlap: float = 75
     tx_vmin: float = 0.0
@@ -18,6 +23,8 @@ class UserSettings: # control panel settings
     fx_vmax: float = 0.4
     spec_vmin: float = 0.0
     spec_vmax: float = 0.4
+    precision: str = "float32"  # "float32" or "float64" for loaded data and derived plots
+    lowpass: str = "butterworth"  # spectral taper ("butterworth", "cosine") or "filtfilt"
 
 # -------------------------------------
 #   Default Event Labels
@@ -36,15 +43,110 @@ DEFAULT_LABEL_MAPPING = {
 }
 
 DEFAULT_DATASET_PATH = r"F:"
-DEFAULT_SAVE_PATH = r"C:\Users\ers334\Documents\databases\DAS_Annotations\A25.db"
+# labels database; ~ is the user's home directory on every platform (folders are created on first use)
+DEFAULT_SAVE_PATH = os.path.join(os.path.expanduser("~"), "Documents", "databases",
+                                 "DAS_Annotations", "A25.db")
+
+# -------------------------------------
+#   Data loading / caching
+# -------------------------------------
+# Upper bound on memory held by the cache of rehydrated (and filtered) files.
+# Each cached file (samples + envelope) costs roughly nx * ns * 8 bytes in
+# float32 and twice that in float64.
+FILE_CACHE_MAX_BYTES = 2 * 1024**3
+
+# Upper bound on memory for the loaded window: the ring buffer (samples and
+# envelope, each stored twice) plus the FX slices. Longer durations are
+# shortened to fit; at 2000 channels, 200 Hz and float32 4 GiB is about 10 min.
+WINDOW_MAX_BYTES = 4 * 1024**3
+
+# Background prefetch of the files adjacent to the loaded window
+PREFETCH_AHEAD = 1     # files after the window to rehydrate in the background
+PREFETCH_BEHIND = 0    # files before the window (useful when stepping backward)
+PREFETCH_WORKERS = 1
+
+# Open HDF5 files kept per dataset directory (saves open/metadata time per load)
+H5_MAX_OPEN_FILES = 8
+
+# Worker processes for rehydrating several uncached files of one window at once
+# (long windows, jumps); used when at least REHYDRATE_PARALLEL_MIN_FILES are
+# needed. 1 disables the process pool.
+REHYDRATE_PROCESSES = min(8, os.cpu_count() or 1)
+REHYDRATE_PARALLEL_MIN_FILES = 3
+
+# Optional on-disk cache of rehydrated, filtered float32 files, memory-mapped on
+# reuse. Can be a shared directory; "" disables it.
+DISK_CACHE_DIR = ""
+DISK_CACHE_MAX_BYTES = 50 * 1024**3
+
+# Spectrograms: rows kept per (window, nfft, overlap), and whether to compute
+# every channel of each new window in the background (memory: nx * nfreq * ntimes)
+SPECTROGRAM_CACHE_ROWS = 256
+SPECTROGRAM_PRECOMPUTE_ALL = False
+# Largest all-channel stack; for bigger windows/overlaps rows are computed one at a time
+SPECTROGRAM_STACK_MAX_BYTES = 1 * 1024**3
+
+# Hover spectrogram mode ('h'): time allowed per update (one 60 Hz frame)
+HOVER_FRAME_BUDGET_MS = 16.0
 
 # -------------------------------------
 #   Plot color map definition(s)
 # -------------------------------------
 
+# matplotlib's 'turbo' sampled at 256 points, as RGB (alpha is always 255).
+# Precomputed so that starting the GUI doesn't import matplotlib; regenerate with
+# (matplotlib.colormaps['turbo'](np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+_TURBO_RGB = (
+    (48, 18, 59), (49, 21, 66), (50, 24, 74), (52, 27, 81), (53, 30, 88), (54, 33, 95),
+    (55, 35, 101), (56, 38, 108), (57, 41, 114), (58, 44, 121), (59, 47, 127), (60, 50, 133),
+    (60, 53, 139), (61, 55, 145), (62, 58, 150), (63, 61, 156), (64, 64, 161), (64, 67, 166),
+    (65, 69, 171), (65, 72, 176), (66, 75, 181), (67, 78, 186), (67, 80, 190), (67, 83, 194),
+    (68, 86, 199), (68, 88, 203), (69, 91, 206), (69, 94, 210), (69, 96, 214), (69, 99, 217),
+    (70, 102, 221), (70, 104, 224), (70, 107, 227), (70, 109, 230), (70, 112, 232), (70, 115, 235),
+    (70, 117, 237), (70, 120, 240), (70, 122, 242), (70, 125, 244), (70, 127, 246), (70, 130, 248),
+    (69, 132, 249), (69, 135, 251), (69, 137, 252), (68, 140, 253), (67, 142, 253), (66, 145, 254),
+    (65, 147, 254), (64, 150, 254), (63, 152, 254), (62, 155, 254), (60, 157, 253), (59, 160, 252),
+    (57, 162, 252), (56, 165, 251), (54, 168, 249), (52, 170, 248), (51, 172, 246), (49, 175, 245),
+    (47, 177, 243), (45, 180, 241), (43, 182, 239), (42, 185, 237), (40, 187, 235), (38, 189, 233),
+    (37, 192, 230), (35, 194, 228), (33, 196, 225), (32, 198, 223), (30, 201, 220), (29, 203, 218),
+    (28, 205, 215), (27, 207, 212), (26, 209, 210), (25, 211, 207), (24, 213, 204), (24, 215, 202),
+    (23, 217, 199), (23, 218, 196), (23, 220, 194), (23, 222, 191), (24, 224, 189), (24, 225, 186),
+    (25, 227, 184), (26, 228, 182), (27, 229, 180), (29, 231, 177), (30, 232, 175), (32, 233, 172),
+    (34, 235, 169), (36, 236, 166), (39, 237, 163), (41, 238, 160), (44, 239, 157), (47, 240, 154),
+    (50, 241, 151), (53, 243, 148), (56, 244, 145), (59, 244, 141), (63, 245, 138), (66, 246, 135),
+    (70, 247, 131), (74, 248, 128), (77, 249, 124), (81, 249, 121), (85, 250, 118), (89, 251, 114),
+    (93, 251, 111), (97, 252, 108), (101, 252, 104), (105, 253, 101), (109, 253, 98), (113, 253, 95),
+    (116, 254, 92), (120, 254, 89), (124, 254, 86), (128, 254, 83), (132, 254, 80), (135, 254, 77),
+    (139, 254, 75), (142, 254, 72), (146, 254, 70), (149, 254, 68), (152, 254, 66), (155, 253, 64),
+    (158, 253, 62), (161, 252, 61), (164, 252, 59), (166, 251, 58), (169, 251, 57), (172, 250, 55),
+    (174, 249, 55), (177, 248, 54), (179, 248, 53), (182, 247, 53), (185, 245, 52), (187, 244, 52),
+    (190, 243, 52), (192, 242, 51), (195, 241, 51), (197, 239, 51), (200, 238, 51), (202, 237, 51),
+    (205, 235, 52), (207, 234, 52), (209, 232, 52), (212, 231, 53), (214, 229, 53), (216, 227, 53),
+    (218, 226, 54), (221, 224, 54), (223, 222, 54), (225, 220, 55), (227, 218, 55), (229, 216, 56),
+    (231, 215, 56), (232, 213, 56), (234, 211, 57), (236, 209, 57), (237, 207, 57), (239, 205, 57),
+    (240, 203, 58), (242, 200, 58), (243, 198, 58), (244, 196, 58), (246, 194, 58), (247, 192, 57),
+    (248, 190, 57), (249, 188, 57), (249, 186, 56), (250, 183, 55), (251, 181, 55), (251, 179, 54),
+    (252, 176, 53), (252, 174, 52), (253, 171, 51), (253, 169, 50), (253, 166, 49), (253, 163, 48),
+    (254, 161, 47), (254, 158, 46), (254, 155, 45), (254, 152, 44), (253, 149, 43), (253, 146, 41),
+    (253, 143, 40), (253, 140, 39), (252, 137, 38), (252, 134, 36), (251, 131, 35), (251, 128, 34),
+    (250, 125, 32), (250, 122, 31), (249, 119, 30), (248, 116, 28), (247, 113, 27), (247, 110, 26),
+    (246, 107, 24), (245, 104, 23), (244, 101, 22), (243, 99, 21), (242, 96, 20), (241, 93, 19),
+    (239, 90, 17), (238, 88, 16), (237, 85, 15), (236, 82, 14), (234, 80, 13), (233, 77, 13),
+    (232, 75, 12), (230, 73, 11), (229, 70, 10), (227, 68, 10), (226, 66, 9), (224, 64, 8),
+    (222, 62, 8), (221, 60, 7), (219, 58, 7), (217, 56, 6), (215, 54, 6), (214, 52, 5),
+    (212, 50, 5), (210, 48, 5), (208, 47, 4), (206, 45, 4), (203, 43, 3), (201, 41, 3),
+    (199, 40, 3), (197, 38, 2), (195, 36, 2), (192, 35, 2), (190, 33, 2), (187, 31, 1),
+    (185, 30, 1), (182, 28, 1), (180, 27, 1), (177, 25, 1), (174, 24, 1), (172, 22, 1),
+    (169, 21, 1), (166, 20, 1), (163, 18, 1), (160, 17, 1), (157, 16, 1), (154, 14, 1),
+    (151, 13, 1), (148, 12, 1), (145, 11, 1), (142, 10, 1), (139, 9, 1), (135, 8, 1),
+    (132, 7, 1), (129, 6, 2), (125, 5, 2), (122, 4, 2),
+)
+
+
 def turbo_lut():
-    # turbo color scheme look-up table
-    cmap = plt.get_cmap('turbo')
-    return (cmap(np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+    # turbo color scheme look-up table (256 x RGBA, uint8)
+    lut = np.full((256, 4), 255, dtype=np.uint8)
+    lut[:, :3] = _TURBO_RGB
+    return lut
 
-PLOTCOLOR_LUT = turbo_lut()
\ No newline at end of file
+PLOTCOLOR_LUT = turbo_lut()
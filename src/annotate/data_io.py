@@ -5,18 +5,97 @@ incompatibility between DAS4Whales and PyQt6 needs to be resolved first.
 """
 
 import os
-import h5py
+import json
+import hashlib
+import threading
+from collections import OrderedDict
 import numpy as np
+# h5py and scipy are imported where used, so importing the GUI doesn't load them
 
 # -----------------------------------------------
 # load and rehydrate data from h5
 # -----------------------------------------------
-def load_preprocessed_h5(filepath):
+def load_preprocessed_h5(filepath, pool=None):
+    """
+    Return (fk_dehyd, timestamp) of one preprocessed file.
+
+    With an `H5HandlePool`, the file stays open for later reads and fk_dehyd
+    is the pool's reusable buffer (see `H5HandlePool.read_fk`).
+    """
+    if pool is not None:
+        return pool.read_fk(filepath)
+    import h5py
     with h5py.File(filepath, 'r') as h:
         fk_dehyd = h['fk_dehyd'][...]
         timestamp = h['timestamp'][()]
     return fk_dehyd, timestamp
 
+
+class H5HandlePool:
+    """
+    Bounded set of open read-only h5py files from one dataset directory.
+
+    Opening a file (and reading its metadata) is a noticeable part of each load
+    on network or USB storage, so handles are kept open and closed in
+    least-recently-used order, or all at once when the directory changes.
+    fk_dehyd is read with `read_direct` into a buffer reused per thread.
+    """
+    def __init__(self, max_open=8):
+        self.max_open = max_open
+        self.directory = None
+        self._files = OrderedDict()  # filepath -> h5py.File
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def set_directory(self, directory):
+        """Switch to `directory`, closing the handles of the previous one."""
+        with self._lock:
+            if directory != self.directory:
+                self._close_all()
+                self.directory = directory
+
+    def read_fk(self, filepath):
+        """
+        Return (fk_dehyd, timestamp). fk_dehyd is overwritten by the next read
+        on the same thread; copy it to keep it.
+        """
+        with self._lock:  # h5py serialises reads anyway; the lock also guards eviction
+            h = self._get(filepath)
+            dset = h['fk_dehyd']
+            buf = getattr(self._local, 'fk_buffer', None)
+            if buf is None or buf.shape != dset.shape or buf.dtype != dset.dtype:
+                buf = np.empty(dset.shape, dtype=dset.dtype)
+                self._local.fk_buffer = buf
+            dset.read_direct(buf)
+            timestamp = h['timestamp'][()]
+        return buf, timestamp
+
+    def close(self):
+        with self._lock:
+            self._close_all()
+
+    def _get(self, filepath):
+        h = self._files.get(filepath)
+        if h is not None:
+            self._files.move_to_end(filepath)
+            return h
+        if os.path.dirname(os.path.abspath(filepath)) != os.path.abspath(self.directory or ''):
+            # not from the current dataset: don't let it displace pooled handles
+            self._close_all()
+            self.directory = os.path.dirname(os.path.abspath(filepath))
+        import h5py
+        h = h5py.File(filepath, 'r')
+        self._files[filepath] = h
+        while len(self._files) > self.max_open:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return h
+
+    def _close_all(self):
+        for h in self._files.values():
+            h.close()
+        self._files.clear()
+
 def rehydrate(fk_dehyd, nonzeros, original_shape, return_format='tx'):
     nx, nt = original_shape
     nf = nt // 2 + 1
@@ -34,6 +113,313 @@ def rehydrate(fk_dehyd, nonzeros, original_shape, return_format='tx'):
         return tx_data
     else:
         raise ValueError("return_format must be 'tx' or 'fk'")
+
+
+class SparseRehydrator:
+    """
+    Rehydration plan for one settings.h5: transforms only the occupied frequency columns.
+
+    The nonzeros mask is the same for every file in a dataset, so the mask is
+    validated and the occupied columns, scatter indices, output scaling and
+    scratch arrays are set up once; `apply` then only scatters and transforms.
+    Empty columns are zero after the x-axis inverse FFT too, so they are left
+    at zero instead of being transformed. (scipy.fft caches its own FFT plans.)
+    """
+    def __init__(self, nonzeros, original_shape, scale=1.0):
+        nx, nt = original_shape
+        nf = nt // 2 + 1
+        if nonzeros.shape != (nx, nf):
+            raise ValueError("Mask shape mismatch")
+        self.nx, self.nt, self.nf = nx, nt, nf
+        self.scale = scale  # applied to every output (e.g. 1e9 for strain -> nanostrain)
+        self.n_nonzero = int(np.count_nonzero(nonzeros))
+        # frequency columns holding at least one coefficient
+        self.cols = np.flatnonzero(nonzeros.any(axis=0))
+        # dropping empty columns keeps the row-major order of the mask,
+        # so fk_dehyd scatters straight into the compact (nx, ncols) array
+        self.compact_index = np.flatnonzero(nonzeros[:, self.cols])
+        self._local = threading.local()  # per-thread scratch arrays
+
+    def apply(self, fk_dehyd, return_format='tx', dtype=np.float64, freq_gain=None,
+              channels=None):
+        """
+        Rehydrate one file's coefficients, with the plan's scale applied.
+
+        dtype : float32 or float64
+            Precision of the output; float32 keeps every intermediate in complex64.
+        freq_gain : array of length nf, optional
+            Real gain per frequency column (e.g. from `spectral_taper`), applied
+            before the inverse transforms. Columns with zero gain are skipped.
+        channels : slice, optional
+            Rows of the output ('tx' and 'analytic' only). Every coefficient is
+            still read, since each f-k coefficient contributes to all channels,
+            but the time-axis transform runs only for these rows.
+
+        The scale is folded into the compact f-k coefficients, so it costs
+        nothing on the full-size output.
+        """
+        from scipy import fft as sp_fft
+        if len(fk_dehyd) != self.n_nonzero:
+            raise ValueError("Nonzeros count mismatch")
+        cdtype = np.result_type(dtype, np.complex64)
+        # positions outside compact_index are never written, so the scratch stays zero there
+        compact = self._scratch('compact', (self.nx, len(self.cols)), cdtype)
+        compact.flat[self.compact_index] = fk_dehyd
+        cols = self.cols
+        if freq_gain is not None:
+            gain = np.asarray(freq_gain)[cols].astype(dtype) * self.scale
+            keep = gain != 0
+            compact = compact[:, keep] * gain[keep]
+            cols = cols[keep]
+        elif self.scale != 1:
+            compact *= self.scale
+        if return_format == 'fk':
+            fk_positive = np.zeros((self.nx, self.nf), dtype=cdtype)
+            fk_positive[:, cols] = compact
+            return fk_positive
+        elif return_format == 'tx':
+            # scipy.fft keeps single precision (older numpy.fft upcasts to double)
+            fx_cols = self._inverse_x(compact, channels)
+            fx_domain = self._scratch('fx', (fx_cols.shape[0], self.nf), cdtype, cols)
+            fx_domain[:, cols] = fx_cols
+            return sp_fft.irfft(fx_domain, n=self.nt, axis=1)
+        elif return_format == 'analytic':
+            # one-sided spectrum (DC and Nyquist once, positive frequencies doubled,
+            # negative frequencies zero): real part == 'tx', abs == Hilbert envelope.
+            # Not a scratch array: the in-place ifft below hands its memory to the result.
+            fx_cols = self._inverse_x(compact, channels)
+            spectrum = np.zeros((fx_cols.shape[0], self.nt), dtype=cdtype)
+            spectrum[:, cols] = fx_cols
+            n_edge = 2 if self.nt % 2 == 0 else 1
+            spectrum[:, 1:self.nf - n_edge + 1] *= 2
+            spectrum[:, 0] = spectrum[:, 0].real  # irfft ignores imaginary DC/Nyquist parts
+            if n_edge == 2:
+                spectrum[:, self.nf - 1] = spectrum[:, self.nf - 1].real
+            return sp_fft.ifft(spectrum, axis=1, overwrite_x=True)
+        else:
+            raise ValueError("return_format must be 'tx', 'fk' or 'analytic'")
+
+    def _scratch(self, name, shape, dtype, cols=None):
+        """
+        Zero-initialised array reused by this thread. With `cols`, the columns
+        written by the previous call are zeroed if they differ from `cols`.
+        """
+        spaces = self._local.__dict__.setdefault('spaces', {})
+        key = (name, shape, np.dtype(dtype))
+        entry = spaces.get(key)
+        if entry is None:
+            entry = spaces[key] = [np.zeros(shape, dtype=dtype), cols]
+        elif cols is not None and not np.array_equal(entry[1], cols):
+            entry[0][:, entry[1]] = 0
+            entry[1] = cols
+        return entry[0]
+
+    def _inverse_x(self, compact, channels=None):
+        """x-axis inverse FFT of the compact columns, evaluated only for `channels`."""
+        from scipy import fft as sp_fft
+        if channels is None:
+            return sp_fft.ifft(compact, axis=0)
+        rows = np.arange(self.nx)[channels]
+        if len(rows) > np.log2(self.nx):
+            return sp_fft.ifft(compact, axis=0)[rows]
+        # a handful of channels: the explicit inverse DFT is cheaper than a full ifft
+        phase = np.outer(rows, np.arange(self.nx)) % self.nx
+        kernel = (np.exp(2j * np.pi * phase / self.nx) / self.nx).astype(compact.dtype)
+        return kernel @ compact
+
+
+def spectral_taper(freqs, fs, high_hz=None, low_hz=None, kind='butterworth',
+                   order=10, width_hz=10.0):
+    """
+    Real, zero-phase gain for filtering in the frequency domain.
+
+    Parameters:
+    -----------
+    freqs : array
+        Frequencies (Hz) of the rfft columns
+    fs : float
+        Sampling rate (Hz)
+    high_hz, low_hz : float or None
+        Lowpass and highpass corners; give both for a bandpass
+    kind : str
+        'butterworth' reproduces the magnitude response of `filtfilt` with a
+        digital Butterworth of the given order, i.e. |H|^2 including the
+        bilinear frequency warping. 'cosine' is a raised-cosine transition
+        of `width_hz` centred on each corner.
+
+    Raises ValueError if a corner is not between 0 and fs/2, as `scipy.signal.butter` does.
+    """
+    for name, corner in (('high_hz', high_hz), ('low_hz', low_hz)):
+        if corner is not None and not 0 < corner < fs / 2:
+            raise ValueError(f"{name} must be between 0 and fs/2 = {fs / 2:g} Hz, got {corner:g} Hz")
+    freqs = np.abs(np.asarray(freqs, dtype=float))
+    gain = np.ones_like(freqs)
+    if kind == 'butterworth':
+        warped = np.tan(np.pi * np.minimum(freqs / fs, 0.5))  # tan(pi/2) -> inf -> zero gain
+        with np.errstate(divide='ignore', over='ignore'):
+            if high_hz is not None:
+                gain /= 1 + (warped / np.tan(np.pi * high_hz / fs)) ** (2 * order)
+            if low_hz is not None:
+                gain /= 1 + (np.tan(np.pi * low_hz / fs) / warped) ** (2 * order)
+    elif kind == 'cosine':
+        def ramp(f):  # 0 below the transition, 1 above, cosine in between
+            r = np.clip((f + width_hz / 2) / width_hz, 0, 1)
+            return 0.5 - 0.5 * np.cos(np.pi * r)
+        if high_hz is not None:
+            gain *= ramp(high_hz - freqs)
+        if low_hz is not None:
+            gain *= ramp(freqs - low_hz)
+    else:
+        raise ValueError("kind must be 'butterworth' or 'cosine'")
+    return gain
+
+# -----------------------------------------------
+# read, rehydrate and filter one file (no Qt: also used by worker processes)
+# -----------------------------------------------
+def lowpass_filt(data, fs, cutoff_hz=70):
+    """Zero-phase Butterworth lowpass along the time axis."""
+    import scipy.signal as sp
+    nyq = 0.5 * fs
+    b, a = sp.butter(10, cutoff_hz / nyq, btype='low', analog=False)
+    filtered_data = sp.filtfilt(b, a, data, axis=1)
+    return filtered_data
+
+
+def channel_slice(nx, dx, x_min_m=None, x_max_m=None):
+    """
+    Slice of the nx channels (spacing dx) between x_min_m and x_max_m (None or <= 0 = cable end).
+    A reversed range is swapped; the slice always holds at least one channel.
+    """
+    nx = int(nx)
+    if x_max_m is not None and 0 < x_max_m < (x_min_m or 0):
+        x_min_m, x_max_m = x_max_m, x_min_m
+    start = int(np.clip(np.ceil((x_min_m or 0) / dx - 1e-6), 0, nx - 1))
+    stop = nx
+    if x_max_m is not None and x_max_m > 0:
+        stop = int(np.clip(np.floor(x_max_m / dx + 1e-6) + 1, start + 1, nx))
+    return slice(start, stop)
+
+
+def rehydrate_h5(filepath, plan, h5settings, channels=None, filter_lowpass=True, cutoff_hz=70,
+                 dtype=np.float64, lowpass='butterworth', envelope=False, h5_pool=None):
+    """
+    Read, rehydrate and filter one file; returns (amp, timestamp, env or None).
+
+    See `PreprocessedDataManager.load_and_rehydrate_h5` for the options. `plan`
+    is the dataset's `SparseRehydrator`; h5settings needs 'fs' and 'ns'.
+    """
+    import scipy.signal as sp
+    dtype = np.dtype(dtype)
+    fk_dehyd, timestamp = load_preprocessed_h5(filepath, pool=h5_pool)
+    spectral = filter_lowpass and lowpass != 'filtfilt'
+    freq_gain = None
+    if spectral:
+        freqs = np.fft.rfftfreq(h5settings['ns'], d=1/h5settings['fs'])
+        freq_gain = spectral_taper(freqs, h5settings['fs'], high_hz=cutoff_hz, kind=lowpass)
+    env = None
+    if envelope and (spectral or not filter_lowpass):
+        analytic = plan.apply(fk_dehyd, return_format='analytic', dtype=dtype,
+                              freq_gain=freq_gain, channels=channels)
+        amp = np.ascontiguousarray(analytic.real)
+        env = np.abs(analytic)
+        del analytic
+    else:
+        amp = plan.apply(fk_dehyd, dtype=dtype, freq_gain=freq_gain, channels=channels)
+        if filter_lowpass and lowpass == 'filtfilt':
+            amp = lowpass_filt(amp, h5settings['fs'], cutoff_hz=cutoff_hz).astype(dtype, copy=False)
+        if envelope:
+            env = np.abs(sp.hilbert(amp, axis=1)).astype(dtype, copy=False)
+    return amp, timestamp, env
+
+
+class DiskFileCache:
+    """
+    Size-bounded on-disk cache of rehydrated, filtered files.
+
+    Each entry is one float32 .npy holding amp and env stacked, plus a small
+    .json with the timestamp; hits are memory-mapped read-only. Keys combine
+    the settings.h5 hash, the source file name, size and modification time,
+    and the filter parameters, so one cache directory can be shared by several
+    users and datasets, and a re-preprocessed or rewritten file is a miss. Least recently used entries (by file mtime, refreshed on each
+    hit) are deleted once the directory exceeds `max_bytes`. Pickles as its
+    directory and size limit, so worker processes can use the same cache.
+    """
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        return (DiskFileCache, (self.directory, self.max_bytes))
+
+    @staticmethod
+    def make_key(settings_hash, filepath, params):
+        # every fk_dehyd of a dataset has the same size: the mtime tells rewrites apart
+        st = os.stat(filepath)
+        source = (os.path.basename(filepath), st.st_size, st.st_mtime_ns)
+        return hashlib.sha1(repr((settings_hash, source, params)).encode()).hexdigest()
+
+    def __contains__(self, key):
+        return all(os.path.exists(path) for path in self._paths(key))
+
+    def get(self, key):
+        """Return (amp, env, timestamp) as read-only memory maps, or None."""
+        npy_path, json_path = self._paths(key)
+        try:
+            with open(json_path) as f:
+                timestamp = json.load(f)['timestamp']
+            data = np.load(npy_path, mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(npy_path)  # LRU touch; not possible in a read-only cache directory
+        except OSError:
+            pass
+        return data[0], data[1], timestamp
+
+    def put(self, key, amp, env, timestamp):
+        npy_path, json_path = self._paths(key)
+        tmp_path = f"{npy_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.stack([amp, env]).astype(np.float32, copy=False))
+            with open(json_path, 'w') as f:
+                json.dump({'timestamp': float(timestamp)}, f)
+            os.replace(tmp_path, npy_path)  # readers never see a half-written file
+        except OSError as e:
+            print(f"Could not write disk cache entry {npy_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + '.npy', base + '.json'
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith('.npy'):
+                    try:
+                        st = os.stat(os.path.join(self.directory, name))
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                npy_path, json_path = self._paths(name[:-len('.npy')])
+                try:
+                    os.remove(npy_path)
+                    os.remove(json_path)
+                except OSError:
+                    continue  # still mapped elsewhere (Windows) or already gone
+                total -= size
+
 # -----------------------------------------------
 # find, loading, and preparing settings from settings.h5
 # -----------------------------------------------
@@ -45,15 +431,39 @@ def find_settings_h5(filepath):
         return None
     
 
-def load_settings_preprocessed_h5(filepath):
+_settings_cache = OrderedDict()  # (abs path, mtime) -> settings_data
+_SETTINGS_CACHE_SIZE = 8
+
+
+def load_settings_preprocessed_h5(filepath, use_cache=True):
     """
     Load settings and rehydration info.
+
+    Parsed settings are cached by path and modification time, so switching
+    back to a dataset doesn't re-read its settings.h5. Treat the result as
+    read-only when caching.
     
     Returns:
     --------
     settings_data : dict
         Dictionary with all settings and rehydration info
     """
+    if not use_cache:
+        return _parse_settings_preprocessed_h5(filepath)
+    key = (os.path.abspath(filepath), os.path.getmtime(filepath))
+    settings_data = _settings_cache.get(key)
+    if settings_data is None:
+        settings_data = _parse_settings_preprocessed_h5(filepath)
+        _settings_cache[key] = settings_data
+        while len(_settings_cache) > _SETTINGS_CACHE_SIZE:
+            _settings_cache.popitem(last=False)
+    else:
+        _settings_cache.move_to_end(key)
+    return settings_data
+
+
+def _parse_settings_preprocessed_h5(filepath):
+    import h5py
     with h5py.File(filepath, 'r') as f:
         settings_data = {
             'created': f.attrs.get('created', 'unknown'),
@@ -1,13 +1,23 @@
 import numpy as np
-import os, sqlite3, json, uuid, getpass, datetime
+import os, sqlite3, json, uuid, getpass, datetime, hashlib
+import threading
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from PyQt6.QtCore import QObject, pyqtSignal
-import scipy.signal as sp
-from . import data_io as io
+from . import data_io as io  # scipy is imported where used, to keep GUI start-up fast
+from .rehydrate_pool import ParallelRehydrator
+from .config import (
+    FILE_CACHE_MAX_BYTES, WINDOW_MAX_BYTES, H5_MAX_OPEN_FILES, PREFETCH_AHEAD, PREFETCH_BEHIND, PREFETCH_WORKERS,
+    REHYDRATE_PROCESSES, REHYDRATE_PARALLEL_MIN_FILES, DISK_CACHE_DIR, DISK_CACHE_MAX_BYTES,
+    SPECTROGRAM_CACHE_ROWS, SPECTROGRAM_PRECOMPUTE_ALL, SPECTROGRAM_STACK_MAX_BYTES, UserSettings
+)
 
 class PreprocessedDataManager(QObject):
     dataset_loaded = pyqtSignal()      # tell panels to redraw with whatever data is loaded
     settings_changed = pyqtSignal()    # for appearance-only changes in TX/FX plots
     file_loaded = pyqtSignal(str, str)  # filename, timestamp_string
+    label_db_error = pyqtSignal(str)    # a queued label database operation failed
 
     def __init__(self):
         super().__init__()
@@ -17,13 +27,40 @@ class PreprocessedDataManager(QObject):
         }
         self.filepath = ''
         self.directory = ''
-        self.label_saver = None 
+        self.label_writer = None  # LabelWriter: LabelSaver calls on a background thread
+        self.rehydrator = None  # io.SparseRehydrator, rebuilt with each settings.h5
+        self.settings_filepath = None
 
         self.loaded_files_indices = []
-        self.cursor_mode = ''  # '', 's' (spectrogram), 'a' (annotation)
+        # Window position in dataset samples (file index * ns + sample in file)
+        self.window_start = 0
+        self.window_samples = 0
+        self.window_buffer = RingWindowBuffer()
+        self.window_generation = 0  # incremented whenever the window contents change
+        self.window_key = None  # what the loaded window holds, see get_window_key
+        self.cursor_mode = ''  # '', 's' (spectrogram), 'h' (hover spectrogram), 'a' (annotation)
+
+        # Rehydrated files, so navigation only pays for files not seen recently
+        self.file_cache = RehydratedFileCache(max_bytes=FILE_CACHE_MAX_BYTES)
+        self.lowpass_cutoff_hz = 70
+
+        # Background prefetch of neighbouring files into the file cache (and disk cache writes)
+        self.prefetch_ahead = PREFETCH_AHEAD
+        self.prefetch_behind = PREFETCH_BEHIND
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS,
+                                                     thread_name_prefix='prefetch')
+        self._prefetch_jobs = {}  # cache key -> Future
+        # Open HDF5 files of the current dataset (closed on dataset switch/eviction)
+        self.h5_pool = io.H5HandlePool(max_open=H5_MAX_OPEN_FILES)
+        # Optional float32 cache of rehydrated files on disk, shared between sessions
+        self.disk_cache = io.DiskFileCache(DISK_CACHE_DIR, DISK_CACHE_MAX_BYTES) if DISK_CACHE_DIR else None
+        self.settings_hash = None
+        # Worker processes for windows that need several uncached files at once
+        self.parallel_rehydrator = ParallelRehydrator(workers=REHYDRATE_PROCESSES)
 
         # Loaded continuous data
-        self.loaded_data = {'amp': None, 't': None, 'x': None, 'time_stamps': None}
+        self.loaded_data = {'amp': None, 'env': None, 't': None, 'x': None,
+                            'time_stamps': None, 'segments': [], 'start_sample': 0}
         self.display_idx = None
 
         # Store last applied user settings (sliders etc.)
@@ -36,6 +73,9 @@ class PreprocessedDataManager(QObject):
     def apply_user_settings(self, user_settings: dict):
         """Store UI settings (vmin/vmax, nfft, overlap, label mapping, etc.)"""
         self._user_settings = user_settings
+        if self.directory and 'duration_s' in user_settings:
+            # takes effect with the next (re)load of the window, e.g. Apply Changes
+            self.window_samples = self._window_samples(user_settings['duration_s'])
         self.settings_changed.emit()
 
     def get_user_settings(self, name=None):
@@ -44,7 +84,7 @@ class PreprocessedDataManager(QObject):
         return self._user_settings.get(name)
 
     def new_file_selected(self, filepath):
-        """Load the selected file + following file into a 60s window."""
+        """Load a window (duration_s setting, default 60s) starting at the selected file."""
         filepath = os.path.normpath(filepath)
         self.filepath = filepath
         selected_directory = os.path.dirname(filepath)
@@ -52,12 +92,12 @@ class PreprocessedDataManager(QObject):
 
         if selected_directory != self.directory:
             # directory has changed, reload settings
-            self.directory = selected_directory
-            # Load dataset settings (h5)
             settings_filepath = io.find_settings_h5(filepath)
             if settings_filepath is None:
                 raise ValueError("No settings.h5 file found.")
+            # waits for prefetches of the old dataset, so switch the directory only after it
             self.set_h5settings(settings_filepath)
+            self.directory = selected_directory
 
         # Ensure filenames is a Python list
         filenames = list(self.h5settings['file_map']['filename'])
@@ -66,64 +106,151 @@ class PreprocessedDataManager(QObject):
         except ValueError:
             raise RuntimeError(f"File {filepath} not in file_map")
 
-        # Choose previous/current/next file indices
-        indices = [i for i in [idx, idx + 1]
-                if 0 <= i < len(filenames)]
-        self.loaded_files_indices = indices
+        # Window starts at the selected file (60 s by default: file + following file)
+        duration_s = self.get_user_settings('duration_s') or UserSettings.duration_s
+        ns = self.h5settings['ns']
+        self.window_start = idx * ns
+        self.window_samples = self._window_samples(duration_s)
 
         # Initial load: recompute FX as well
         self.load_current_window(recompute_fx=True)
 
-    def navigate(self, direction):
-        """Move the 60s window forward/backward by 30s – TX only update."""
-        filenames = self.h5settings['file_map']['filename']
-        # TODO set self.filepath as the new first file in window
-        
+    def load_window(self, start_timestamp, duration_s):
+        """
+        Load `duration_s` seconds of data starting at absolute (unix) time `start_timestamp`.
+
+        The start is resolved to a file and sample through `file_map`; if it falls
+        in a gap between files the window starts at the next file.
+        """
+        file_map = self.h5settings['file_map']
+        timestamps = np.asarray(file_map['timestamp'], dtype=float)
+        fs, ns = self.h5settings['fs'], self.h5settings['ns']
+        inside = np.flatnonzero((timestamps <= start_timestamp) &
+                                (start_timestamp < timestamps + ns / fs))
+        if len(inside):
+            idx = int(inside[0])
+            offset = int(round((start_timestamp - timestamps[idx]) * fs))
+        else:
+            later = np.flatnonzero(timestamps > start_timestamp)
+            if not len(later):
+                raise ValueError("Start time is after the end of the dataset.")
+            idx, offset = int(later[np.argmin(timestamps[later])]), 0
+        self.window_start = idx * ns + min(offset, ns - 1)
+        self.window_samples = self._window_samples(duration_s)
+        self.load_current_window(recompute_fx=True)
+
+    def selected_file_timestamp(self):
+        """Start (unix) time of the file selected with new_file_selected, from the file_map."""
+        file_map = self.h5settings['file_map']
+        idx = list(file_map['filename']).index(os.path.basename(self.filepath))
+        return float(file_map['timestamp'][idx])
+
+    def _duration_to_samples(self, duration_s):
+        return max(1, int(round(duration_s * self.h5settings['fs'])))
+
+    def _window_samples(self, duration_s):
+        """Window length in samples, shortened so the window fits in WINDOW_MAX_BYTES."""
+        n_samples = self._duration_to_samples(duration_s)
+        options = self._load_options()
+        channels = self.channel_range(options['x_min_m'], options['x_max_m'])
+        # ring buffer: amp and env, each mirrored; FX: win // 2 + 1 values per slice step
+        win_samples = self._duration_to_samples(self.get_user_settings('win_s') or 2.0)
+        overlap = self.get_user_settings('fx_overlap') or 0
+        step_samples = max(1, win_samples - int(win_samples * overlap / 100))
+        copies = 4 + (win_samples // 2 + 1) / step_samples
+        bytes_per_sample = copies * (channels.stop - channels.start) * np.dtype(options['dtype']).itemsize
+        max_samples = max(1, int(WINDOW_MAX_BYTES // bytes_per_sample))
+        if n_samples > max_samples:
+            print(f"Duration {duration_s:g} s needs more than {WINDOW_MAX_BYTES / 1024**3:g} GiB; "
+                  f"loading {max_samples / self.h5settings['fs']:.0f} s instead.")
+            n_samples = max_samples
+        return n_samples
+
+    def _dataset_samples(self):
+        return len(self.h5settings['file_map']['filename']) * self.h5settings['ns']
+
+    def navigate(self, direction, step_s=None):
+        """Slide the window forward/backward by `step_s` (default: nav_step_s setting)."""
+        if step_s is None:
+            step_s = self.get_user_settings('nav_step_s') or UserSettings.nav_step_s
+        step = self._duration_to_samples(step_s)
+        total = self._dataset_samples()
+
         if direction == 'forward':
-            last_idx = self.loaded_files_indices[-1]
-            next_idx = last_idx + 1
-            if next_idx >= len(filenames):
+            if self.window_start + self.window_samples >= total:
                 print("Already at end of dataset.")
                 return
-            self.loaded_files_indices.pop(0)
-            self.loaded_files_indices.append(next_idx)
+            self.window_start = min(self.window_start + step, total - self.window_samples)
 
         elif direction == 'backward':
-            first_idx = self.loaded_files_indices[0]
-            prev_idx = first_idx - 1
-            if prev_idx < 0:
+            if self.window_start <= 0:
                 print("Already at beginning of dataset.")
                 return
-            self.loaded_files_indices.pop()
-            self.loaded_files_indices.insert(0, prev_idx)
+            self.window_start = max(self.window_start - step, 0)
 
         # update plots (including fx)
         self.load_current_window(recompute_fx=True)
 
+    def _window_segments(self, start, n_samples):
+        """Split dataset samples [start, start + n_samples) into (file idx, first sample, n) pieces."""
+        ns = self.h5settings['ns']
+        end = min(start + n_samples, self._dataset_samples())
+        segments = []
+        pos = start
+        while pos < end:
+            idx, local = divmod(pos, ns)
+            n = min(ns - local, end - pos)
+            segments.append((int(idx), int(local), int(n)))
+            pos += n
+        return segments
+
     def load_current_window(self, recompute_fx=True):
-        """Load and concatenate the files in `loaded_files_indices`."""
-        amp_list, ts_list = [], []
-        x = None
-        for idx in self.loaded_files_indices:
-            filepath = os.path.join(self.directory, self.h5settings['file_map']['filename'][idx])
-            amp, t, x, ts = self.load_and_rehydrate_h5(filepath)
-            amp_list.append(amp)
-            ts_list.append(np.atleast_1d(ts))  # ensure array shape
-
-        amp = np.concatenate(amp_list, axis=1)
-        time_stamps = np.concatenate(ts_list)
+        """
+        Show samples [window_start, window_start + window_samples).
 
+        The window lives in a ring buffer: after a slide only the newly exposed
+        samples are copied in, and the panels get a view of the buffer.
+        """
+        total = self._dataset_samples()
+        n_samples = min(self.window_samples, total)
+        self.window_start = max(0, min(self.window_start, total - n_samples))
         fs = self.h5settings['fs']
-        total_samples = amp.shape[1]
-        tvec = np.arange(total_samples) / fs
+        file_timestamps = self.h5settings['file_map']['timestamp']
 
-        self.loaded_data['amp'] = amp
-        self.loaded_data['x'] = x
-        self.loaded_data['time_stamps'] = time_stamps
+        # buffer contents are only valid for the same data source and load options
+        options = self._load_options()
+        channels = self.channel_range(options['x_min_m'], options['x_max_m'])
+        tag = (self.directory, tuple(sorted(options.items())))
+        self.window_buffer.ensure(('amp', 'env'), channels.stop - channels.start, n_samples,
+                                  np.dtype(self.get_precision()), tag)
+        # before the buffer is overwritten, so in-flight jobs on the old window see the change
+        self.window_generation += 1
+        fills = []  # (window column, file index, first sample in file, n samples)
+        for first, count in self.window_buffer.slide_to(self.window_start):
+            offset = first
+            for idx, local, n in self._window_segments(self.window_start + first, count):
+                fills.append((offset, idx, local, n))
+                offset += n
+        self._fill_window(fills, options)
+
+        segments = self._window_segments(self.window_start, n_samples)
+        time_stamps = np.array([float(file_timestamps[idx]) + local / fs
+                                for idx, local, _ in segments])
+        self.loaded_files_indices = [idx for idx, _, _ in segments]
+        self.window_key = (self.directory, tuple(segments), tuple(sorted(options.items())))
+        tvec = np.arange(n_samples) / fs
+
+        self.loaded_data['amp'] = self.window_buffer.view('amp')
+        self.loaded_data['env'] = self.window_buffer.view('env')  # Hilbert envelope of amp, for display only
+        self.loaded_data['x'] = np.arange(channels.start, channels.stop) * self.h5settings['dx']
+        self.loaded_data['time_stamps'] = time_stamps  # start time of each segment
         self.loaded_data['t'] = tvec
+        self.loaded_data['start_sample'] = self.window_start  # dataset sample of t = 0
+        # (file index, first sample in file, n samples) for each piece of the window
+        self.loaded_data['segments'] = segments
 
         # Always display the entire window (retained for future use)
-        self.display_idx = np.ones(total_samples, dtype=bool)
+        self.display_idx = np.ones(n_samples, dtype=bool)
 
         if recompute_fx:
             self.fx_manager.update_data()
@@ -132,6 +259,53 @@ class PreprocessedDataManager(QObject):
         self._emit_file_info() # update filename/timestamp display
         self.dataset_loaded.emit()
 
+        # Start on the files the next navigation step will need
+        self.prefetch_neighbours()
+
+    def _fill_window(self, fills, options):
+        """Copy the file pieces in `fills` into the window buffer."""
+        # files in memory, being prefetched or in the disk cache are cheaper to load here
+        uncached = [fill for fill in fills
+                    if self._file_cache_key(fill[1], options) not in self.file_cache
+                    and self._file_cache_key(fill[1], options) not in self._prefetch_jobs
+                    and not self._in_disk_cache(fill[1], options)]
+        # the pool is started by the first window that could use it; spawning it would
+        # stall that load for seconds, so it loads one by one and later windows use the pool
+        if len(uncached) >= REHYDRATE_PARALLEL_MIN_FILES and not self.parallel_rehydrator.ready():
+            self.parallel_rehydrator.start()
+        elif len(uncached) >= REHYDRATE_PARALLEL_MIN_FILES:
+            try:
+                self._fill_window_parallel(uncached, options)
+                fills = [fill for fill in fills if fill not in uncached]
+            except Exception as e:
+                print(f"Parallel rehydration failed, loading files one by one: {e}")
+        for offset, idx, local, n in fills:
+            file_amp, _, _, _, file_env = self.load_file(idx)
+            self.window_buffer.write('amp', offset, file_amp[:, local:local + n])
+            self.window_buffer.write('env', offset, file_env[:, local:local + n])
+
+    def _fill_window_parallel(self, fills, options):
+        """
+        Rehydrate the files of `fills` in worker processes. The results go through
+        shared memory into the window buffer and are not added to the file cache;
+        the workers store whole files in the disk cache, if there is one.
+        """
+        pieces, column = [], 0
+        for _, idx, local, n in fills:
+            filepath = self.file_path(idx)
+            pieces.append((filepath, local, n, column, self._disk_cache_key(filepath, **options)))
+            column += n
+        targets = self.parallel_rehydrator.rehydrate_pieces(
+            self.settings_filepath, pieces, options,
+            self.window_buffer.view('amp').shape[0], column, disk_cache=self.disk_cache)
+        try:
+            for (offset, _, _, n), (_, _, _, column, _) in zip(fills, pieces):
+                for name in ('amp', 'env'):
+                    self.window_buffer.write(name, offset, targets[name].array[:, column:column + n])
+        finally:
+            for target in targets.values():
+                target.unlink()
+
     def _emit_file_info(self):
         """Emit file_loaded signal with current file info."""
         if self.loaded_data is not None and 'time_stamps' in self.loaded_data:
@@ -140,6 +314,105 @@ class PreprocessedDataManager(QObject):
             timestamp_str = self.get_start_timestamp_string()
             self.file_loaded.emit(filenames_str, timestamp_str)
 
+    def load_file(self, idx):
+        """Return (amp, t, x, timestamp, env) for file `idx`, using the file cache when possible."""
+        options = self._load_options()
+        key = self._file_cache_key(idx, options)
+        cached = self.file_cache.get(key)
+        if cached is not None:
+            return cached
+        job = self._prefetch_jobs.pop(key, None)
+        if job is not None:
+            # Already being prefetched: wait for it rather than loading twice
+            try:
+                return job.result()
+            except Exception as e:
+                print(f"Prefetch of file {idx} failed, loading directly: {e}")
+        result = self.load_and_rehydrate_h5(self.file_path(idx), envelope=True, **options)
+        self.file_cache.put(key, result)
+        return result
+
+    def file_path(self, idx):
+        """Path of file `idx` of the file_map of the current dataset."""
+        return os.path.join(self.directory, self.h5settings['file_map']['filename'][idx])
+
+    def _load_options(self):
+        """Keyword arguments for `load_and_rehydrate_h5`, read from the current settings."""
+        return {'cutoff_hz': self.lowpass_cutoff_hz,
+                'lowpass': self.get_user_settings('lowpass') or UserSettings.lowpass,
+                'dtype': self.get_precision(),
+                'x_min_m': self.get_user_settings('x_min_m') or UserSettings.x_min_m,
+                'x_max_m': self.get_user_settings('x_max_m') or UserSettings.x_max_m}
+
+    def _file_cache_key(self, idx, options):
+        """Cache key: everything that changes the rehydrated output of a file."""
+        return (self.directory, int(idx), tuple(sorted(options.items())))
+
+    def get_window_key(self):
+        """
+        Identifies the data of the loaded window, for caches of derived results.
+
+        Recorded when the window is loaded, not read from the current settings:
+        settings_changed is emitted before the window is reloaded with them.
+        """
+        return self.window_key
+
+    def get_precision(self):
+        """Floating point type used for loaded data and everything derived from it."""
+        return self.get_user_settings('precision') or UserSettings.precision
+
+    def prefetch_neighbours(self):
+        """Queue background loads of the files just outside the current window."""
+        if not self.loaded_files_indices:
+            return
+        n_files = len(self.h5settings['file_map']['filename'])
+        first, last = self.loaded_files_indices[0], self.loaded_files_indices[-1]
+        wanted = [last + k for k in range(1, self.prefetch_ahead + 1)]
+        wanted += [first - k for k in range(1, self.prefetch_behind + 1)]
+        for idx in wanted:
+            if 0 <= idx < n_files:
+                self.prefetch_file(idx)
+
+    def prefetch_file(self, idx):
+        """Rehydrate file `idx` on the worker thread and store it in the file cache."""
+        # forget finished jobs; their results are already in the cache
+        self._prefetch_jobs = {k: f for k, f in self._prefetch_jobs.items() if not f.done()}
+        options = self._load_options()
+        key = self._file_cache_key(idx, options)
+        if key in self.file_cache or key in self._prefetch_jobs:
+            return
+        # the path is resolved now: the job may start after the directory has changed
+        self._prefetch_jobs[key] = self._prefetch_executor.submit(
+            self._prefetch_job, self.file_path(idx), key, options)
+
+    def _prefetch_job(self, filepath, key, options):
+        result = self.load_and_rehydrate_h5(filepath, envelope=True, **options)
+        self.file_cache.put(key, result)
+        return result
+
+    def _wait_for_prefetch(self):
+        """Block until queued prefetches finish (before h5settings change under them)."""
+        for job in list(self._prefetch_jobs.values()):
+            try:
+                job.result()
+            except Exception:
+                pass
+        self._prefetch_jobs.clear()
+
+    def close(self):
+        """Stop background loading and close open files (on application exit)."""
+        self._wait_for_prefetch()
+        self._prefetch_executor.shutdown(wait=True)
+        self.parallel_rehydrator.shutdown()
+        self.h5_pool.close()
+        if self.label_writer is not None:
+            self.label_writer.close()  # writes everything still queued first
+            self.label_writer = None
+
+    def get_cache_stats(self):
+        """Return hit/miss counts and memory use of the file cache."""
+        return self.file_cache.stats()
+
     def get_loaded_filenames_string(self):
         """Get a formatted string of currently loaded filenames."""
         filenames = self.h5settings['file_map']['filename'][self.loaded_files_indices]
@@ -162,71 +435,288 @@ class PreprocessedDataManager(QObject):
         return "No timestamp available"
         
     def set_h5settings(self, settings_filepath):
+        self._wait_for_prefetch()
+        self.h5_pool.set_directory(os.path.dirname(os.path.abspath(settings_filepath)))
+        self.settings_filepath = settings_filepath
         settings = io.load_settings_preprocessed_h5(settings_filepath)
         self.h5settings['fs'] = settings['processing_settings']['fs']
         self.h5settings['dx'] = settings['processing_settings']['dx']
         self.h5settings['nx'], self.h5settings['ns'] = settings['rehydration_info']['target_shape']
         self.h5settings['nonzeros_mask'] = settings['rehydration_info']['nonzeros_mask']
         self.h5settings['file_map'] = settings['file_map']
+        # identifies the rehydration set-up in the on-disk cache, wherever the data is mounted
+        self.settings_hash = hashlib.sha1(
+            np.ascontiguousarray(self.h5settings['nonzeros_mask']).tobytes() +
+            repr((self.h5settings['nx'], self.h5settings['ns'], self.h5settings['fs'],
+                  self.h5settings['dx'])).encode()).hexdigest()
+        # rehydration plan: mask validation, scatter indices and the 1e9 scaling done once
+        self.rehydrator = io.SparseRehydrator(self.h5settings['nonzeros_mask'],
+                                              (self.h5settings['nx'], self.h5settings['ns']),
+                                              scale=1e9)
 
     def set_cursor_mode(self, mode):
         self.cursor_mode = mode
 
-    def load_and_rehydrate_h5(self, filepath, filter_lowpass=True):
-        fk_dehyd, timestamp = io.load_preprocessed_h5(filepath)
-        amp = 1e9 * io.rehydrate(
-            fk_dehyd,
-            self.h5settings['nonzeros_mask'],
-            (self.h5settings['nx'], self.h5settings['ns'])
-        )
-        if filter_lowpass:
-            amp = self.lowpass_filt(amp, cutoff_hz=70)
+    def load_and_rehydrate_h5(self, filepath, filter_lowpass=True, cutoff_hz=70,
+                              dtype=np.float64, lowpass='butterworth', envelope=False,
+                              x_min_m=None, x_max_m=None):
+        """
+        lowpass : str
+            'butterworth' or 'cosine' apply the lowpass as a spectral taper during
+            rehydration; 'filtfilt' runs the time-domain Butterworth afterwards.
+        envelope : bool
+            Also return the Hilbert envelope as a fifth element. With a spectral
+            lowpass it comes from the same inverse transform as amp.
+        x_min_m, x_max_m : float or None
+            Only rehydrate the channels in this distance range (None = cable end).
+            The whole f-k file is still read, but memory and the inverse
+            transforms scale with the number of channels kept.
+        """
+        channels = self.channel_range(x_min_m, x_max_m)
+        disk_key = self._disk_cache_key(filepath, filter_lowpass, cutoff_hz, dtype, lowpass,
+                                        x_min_m, x_max_m)
+        hit = self.disk_cache.get(disk_key) if disk_key is not None else None
+        if hit is not None:
+            amp, env, timestamp = hit
+        else:
+            amp, timestamp, env = io.rehydrate_h5(filepath, self.rehydrator, self.h5settings, channels,
+                                                  filter_lowpass=filter_lowpass, cutoff_hz=cutoff_hz,
+                                                  dtype=dtype, lowpass=lowpass,
+                                                  envelope=envelope or disk_key is not None,
+                                                  h5_pool=self.h5_pool)
+            if disk_key is not None:
+                # ~100 MB per file, possibly to a network share: not on the GUI thread
+                self._prefetch_executor.submit(self.disk_cache.put, disk_key, amp, env, timestamp)
         t = np.arange(0, self.h5settings['ns'], 1) / self.h5settings['fs']
-        x = np.arange(0, self.h5settings['nx'], 1) * self.h5settings['dx']
+        x = np.arange(channels.start, channels.stop, 1) * self.h5settings['dx']
+        if envelope:
+            return amp, t, x, timestamp, env
         return amp, t, x, timestamp
-    
-    def get_labels_in_current_window(self):
-        """Return TX labels in the current display window as a list of dicts."""
-        if not self.label_saver:
-            return []
 
-        try:
-            display_time_start = float(self.loaded_data['time_stamps'][0])
-            display_time_end = float(self.loaded_data['time_stamps'][-1])+self.h5settings['ns']/self.h5settings['fs']
-            dataset = os.path.basename(self.directory)
-
-            sql = """
-                SELECT id, uid, apex_time, apex_distance, x_m, t_s 
-                FROM tx_labels
-                WHERE apex_time >= ? AND apex_time <= ?
-                AND dataset = ?
-            """
-            cur = self.label_saver.conn.execute(sql, (display_time_start, display_time_end, dataset))
-            rows = cur.fetchall()
-            results = []
-            for (tx_id, uid, apex_time, apex_distance, x_m_json, t_s_json) in rows:
-                results.append({
-                    "tx_id": tx_id,
-                    "uid": uid,
-                    "apex_time": apex_time,
-                    "apex_distance": apex_distance,
-                    "x_m": json.loads(x_m_json),
-                    "t_s": json.loads(t_s_json)
-                })
-            return results
+    def _disk_cache_key(self, filepath, filter_lowpass=True, cutoff_hz=70, dtype=np.float64,
+                        lowpass='butterworth', x_min_m=None, x_max_m=None):
+        """Disk cache key of a file loaded with these options; None if they aren't cached."""
+        if self.disk_cache is None or np.dtype(dtype) != np.float32:
+            return None
+        channels = self.channel_range(x_min_m, x_max_m)
+        return self.disk_cache.make_key(
+            self.settings_hash, filepath,
+            (filter_lowpass, cutoff_hz, lowpass, channels.start, channels.stop))
 
-        except Exception as e:
-            print(f"Error querying labels: {e}")
-            return []
+    def _in_disk_cache(self, idx, options):
+        key = self._disk_cache_key(self.file_path(idx), **options)
+        return key is not None and key in self.disk_cache
+
+    def channel_range(self, x_min_m=None, x_max_m=None):
+        """Slice of the channels between x_min_m and x_max_m (None or <= 0 = cable end)."""
+        return io.channel_slice(self.h5settings['nx'], self.h5settings['dx'], x_min_m, x_max_m)
+
+    def set_labels_db(self, db_path):
+        """Write labels to `db_path`; keeps the current writer if the path is unchanged."""
+        if self.label_writer is not None:
+            if self.label_writer.db_path == db_path:
+                return
+            self.label_writer.close()
+        self.label_writer = LabelWriter(db_path)
+        self.label_writer.failed.connect(
+            lambda _, method, error: self.label_db_error.emit(f"Label database {method} failed: {error}"))
+
+    def source_file_at(self, t):
+        """Path of the file holding time `t` (s from the start of the window)."""
+        sample = int(round(t * self.h5settings['fs']))
+        offset = 0
+        for idx, _, n in self.loaded_data['segments']:
+            if sample < offset + n:
+                break
+            offset += n
+        return self.file_path(idx)
+
+    def request_labels_in_current_window(self, callback):
+        """Query TX labels in the current display window; `callback` gets a list of dicts."""
+        if (not self.label_writer or self.loaded_data.get('time_stamps') is None
+                or not self.loaded_data.get('segments')):
+            callback([])  # no database or no window loaded yet
+            return
+        display_time_start = float(self.loaded_data['time_stamps'][0])
+        last_segment_samples = self.loaded_data['segments'][-1][2]
+        display_time_end = float(self.loaded_data['time_stamps'][-1]) + last_segment_samples/self.h5settings['fs']
+        dataset = os.path.basename(self.directory)
+        self.label_writer.submit('get_tx_labels', display_time_start, display_time_end, dataset,
+                                 callback=callback)
+
+    def check_precision(self, file_idx=None, atol=1/255):
+        """
+        Compare the displayed T-X and F-X images of one file between float32 and float64.
+
+        Images are compared after scaling to the current colour levels, so the
+        default tolerance is one step of the 256-entry colour map.
+
+        Returns:
+        --------
+        result : dict
+            max abs difference of the scaled TX and FX images, and whether both are within `atol`
+        """
+        from scipy import fft as sp_fft
+        if file_idx is None:
+            file_idx = self.loaded_files_indices[0]
+        filepath = self.file_path(file_idx)
+        fs = self.h5settings['fs']
+        win_samples = int((self.get_user_settings('win_s') or 2.0) * fs)
+        tx_levels = ((self.get_user_settings('tx_vmin') or 0) / 100,
+                     (self.get_user_settings('tx_vmax') or 40) / 100)
+        fx_levels = (self.get_user_settings('fx_vmin') or 0,
+                     self.get_user_settings('fx_vmax') or 0.4)
+
+        def scaled(img, levels):
+            lo, hi = levels
+            return np.clip((img.astype(np.float64) - lo) / max(hi - lo, 1e-12), 0, 1)
+
+        images = {}
+        for precision in ('float64', 'float32'):
+            options = dict(self._load_options(), dtype=precision)
+            amp, _, _, _, env = self.load_and_rehydrate_h5(filepath, envelope=True, **options)
+            fx = np.abs(sp_fft.rfft(amp[:, :win_samples], axis=1))
+            images[precision] = (scaled(env, tx_levels), scaled(fx, fx_levels))
+
+        tx_err = float(np.max(np.abs(images['float64'][0] - images['float32'][0])))
+        fx_err = float(np.max(np.abs(images['float64'][1] - images['float32'][1])))
+        return {'tx_max_error': tx_err,
+                'fx_max_error': fx_err,
+                'ok': tx_err <= atol and fx_err <= atol}
 
     def lowpass_filt(self, data, cutoff_hz=70):
         """Lowpass filter the data along time axis."""
-        fs = self.h5settings['fs']
-        nyq = 0.5 * fs
-        b, a = sp.butter(10, cutoff_hz / nyq, btype='low', analog=False)
-        filtered_data = sp.filtfilt(b, a, data, axis=1)
-        return filtered_data
-    
+        return io.lowpass_filt(data, self.h5settings['fs'], cutoff_hz=cutoff_hz)
+
+
+class RehydratedFileCache:
+    """
+    Memory-bounded LRU cache of rehydrated files.
+
+    Values are the (amp, t, x, timestamp) tuples returned by
+    `load_and_rehydrate_h5`; their size is counted from the numpy arrays they
+    hold. Cached arrays are shared, so callers must not modify them in place.
+    Safe to use from the prefetch thread.
+    """
+    def __init__(self, max_bytes=FILE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        nbytes = sum(v.nbytes for v in value if isinstance(v, np.ndarray))
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return  # never cache something that would evict everything else
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            self._evict()
+
+    def set_max_bytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'entries': len(self._entries),
+                    'current_bytes': self.current_bytes,
+                    'max_bytes': self.max_bytes}
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.current_bytes -= nbytes
+
+
+class RingWindowBuffer:
+    """
+    Sliding window of fixed length over dataset samples, one array per name.
+
+    Stored as a mirrored ring buffer: every sample is written at position p and
+    p + n of a (rows, 2n) array, so buffer[:, head:head + n] is always the
+    window in time order and can be handed out as a view. Sliding by k
+    samples moves `head` and writes only the k new samples. Views change
+    when the window slides; copy them to keep old data.
+    """
+    def __init__(self):
+        self.n_samples = 0
+        self.start = None   # dataset sample at logical column 0; None = contents invalid
+        self.head = 0
+        self.tag = None
+        self.buffers = {}
+
+    def ensure(self, names, n_rows, n_samples, dtype, tag):
+        """Reallocate if the geometry changed; drop the contents if `tag` changed."""
+        shape = (n_rows, 2 * n_samples)
+        if (set(self.buffers) != set(names) or
+                any(b.shape != shape or b.dtype != dtype for b in self.buffers.values())):
+            self.buffers = {name: np.empty(shape, dtype=dtype) for name in names}
+            self.n_samples = n_samples
+            self.start = None
+        if tag != self.tag:
+            self.tag = tag
+            self.start = None
+
+    def slide_to(self, start):
+        """Move the window to dataset sample `start`; return [(first, count)] columns to fill."""
+        n = self.n_samples
+        if self.start is None or abs(start - self.start) >= n:
+            self.head = 0
+            self.start = start
+            return [(0, n)]
+        shift = start - self.start
+        self.head = (self.head + shift) % n
+        self.start = start
+        if shift > 0:
+            return [(n - shift, shift)]
+        if shift < 0:
+            return [(0, -shift)]
+        return []
+
+    def write(self, name, first, data):
+        """Write `data` (rows, k) into logical window columns [first, first + k)."""
+        buf = self.buffers[name]
+        n = self.n_samples
+        k = data.shape[1]
+        p = (self.head + first) % n
+        k1 = min(k, n - p)
+        buf[:, p:p + k1] = data[:, :k1]
+        buf[:, p + n:p + n + k1] = data[:, :k1]
+        if k1 < k:  # wraps around the end of the ring
+            buf[:, :k - k1] = data[:, k1:]
+            buf[:, n:n + k - k1] = data[:, k1:]
+
+    def view(self, name):
+        return self.buffers[name][:, self.head:self.head + self.n_samples]
+
+
 class FXHandle:
     def __init__(self, data_manager: PreprocessedDataManager):
         self.data_manager = data_manager
@@ -234,6 +724,9 @@ class FXHandle:
         self.freq = None
         self.x = None
         self.plot_start_time = None
+        # |rfft| slices of the last window, keyed by (file index, first sample in file)
+        self._slice_cache = {}
+        self._slice_cache_tag = None
 
     def update_data(self):
         fs = self.data_manager.h5settings['fs']
@@ -241,21 +734,51 @@ class FXHandle:
         amp = self.data_manager.loaded_data['amp']
         x = self.data_manager.loaded_data['x']
         t = self.data_manager.loaded_data['t']
+        overlap = self.data_manager.get_user_settings('fx_overlap') or 0
         win_samples = int(win_s * fs)
-        step_samples = win_samples
-        slices = []
-        t_win = []
+        step_samples = max(1, win_samples - int(win_samples * overlap / 100))
         freqs = np.fft.rfftfreq(win_samples, d=1/fs)
-        for start in range(0, amp.shape[1] - win_samples + 1, step_samples):
-            segment = amp[:, start:start+win_samples]
-            t_win.append(t[start])
-            F = np.fft.rfft(segment, axis=1)
-            slices.append(np.abs(F))
-        self.fx_series_data = np.stack(slices, axis=0)
+        starts = range(0, amp.shape[1] - win_samples + 1, step_samples)
+
+        # Slices are reusable only while the data they came from is unchanged
+        tag = (self.data_manager.directory, win_samples, amp.shape[0],
+               tuple(sorted(self.data_manager._load_options().items())))
+        if tag != self._slice_cache_tag:
+            self._slice_cache = {}
+            self._slice_cache_tag = tag
+
+        fx_series = np.empty((len(starts), amp.shape[0], len(freqs)), dtype=amp.dtype)
+        keys = [self._slice_key(start) for start in starts]
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self._slice_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                fx_series[i] = cached
+        if missing:
+            missing = np.array(missing)
+            if len(missing) == len(keys):
+                fx_transform(amp, win_samples, np.array(starts), out=fx_series)
+            else:
+                fx_series[missing] = fx_transform(amp, win_samples, np.array(starts)[missing])
+        # keep only the slices of this window: the next step reuses the retained part
+        self._slice_cache = dict(zip(keys, fx_series))
+
+        self.fx_series_data = fx_series
         self.freq = freqs
-        self.plot_start_time = t_win
+        self.plot_start_time = [t[start] for start in starts]
         self.x = x
 
+    def _slice_key(self, start):
+        """(file index, sample within that file) of window sample `start`."""
+        offset = 0
+        for file_idx, file_start, n in self.data_manager.loaded_data['segments']:
+            if start < offset + n:
+                return (file_idx, file_start + start - offset)
+            offset += n
+        return (None, start)
+
     def get_dataset(self):
         return {"amp": self.fx_series_data,
                 "freq": self.freq,
@@ -263,39 +786,241 @@ class FXHandle:
                 "t": self.plot_start_time}
 
 
+def fx_transform(amp, win_samples, starts, out=None, workers=-1, max_chunk_bytes=256 * 1024**2):
+    """
+    |rfft| over time of amp[:, start:start + win_samples] for every start, batched.
+
+    Evenly spaced starts (overlapping or not) are taken as a strided
+    (nwin, nx, win_samples) view of amp; other start lists are gathered.
+    Windows are transformed in chunks of at most `max_chunk_bytes` of complex
+    spectrum, using `workers` FFT threads, and written into `out`.
+
+    Returns:
+    --------
+    out : array (nwin, nx, win_samples // 2 + 1), same precision as amp
+    """
+    from scipy import fft as sp_fft
+    starts = np.asarray(starts, dtype=int)
+    nx = amp.shape[0]
+    nfreq = win_samples // 2 + 1
+    if out is None:
+        out = np.empty((len(starts), nx, nfreq), dtype=amp.dtype)
+    if len(starts) == 0:
+        return out
+
+    windows = np.lib.stride_tricks.sliding_window_view(amp, win_samples, axis=1)
+    steps = np.diff(starts)
+    if len(starts) == 1 or (steps[0] > 0 and np.all(steps == steps[0])):
+        hop = int(steps[0]) if len(starts) > 1 else 1
+        windows = windows[:, starts[0]:starts[-1] + 1:hop]
+    else:
+        windows = windows[:, starts]
+    windows = windows.transpose(1, 0, 2)  # (nwin, nx, win_samples), still a view
+
+    spectrum_bytes = nx * nfreq * np.result_type(amp.dtype, np.complex64).itemsize
+    chunk = max(1, int(max_chunk_bytes // spectrum_bytes))
+    for i in range(0, len(starts), chunk):
+        spectrum = sp_fft.rfft(windows[i:i+chunk], axis=-1, workers=workers)
+        np.abs(spectrum, out=out[i:i+chunk])
+    return out
+
+
+def spectrogram_magnitude(data, fs, nfft, percent_overlap):
+    """Magnitude spectrogram along the last axis of `data` (one row or many)."""
+    import scipy.signal as sp
+    Noverlap = int(nfft * percent_overlap / 100)
+    window = sp.windows.tukey(nfft, .25).astype(data.dtype)
+    window_rms = float(np.sqrt(np.sum(window**2)))  # python float keeps Sxx in data's precision
+    freqs, times, Sxx = sp.spectrogram(data,
+                                       fs=fs,
+                                       window=window,
+                                       nperseg=nfft,
+                                       noverlap=Noverlap,
+                                       scaling='spectrum',
+                                       mode='magnitude',
+                                       axis=-1)
+    Sxx *= nfft / window_rms
+    return freqs, times, Sxx
+
+
 class SpectrogramHandle:
+    """
+    Spectrograms of single rows of the loaded window.
+
+    Results are kept in an LRU cache keyed by (window, row, nfft, overlap), so
+    re-selecting a row or changing unrelated settings is a lookup. Optionally a
+    background job computes the spectrogram of every channel of the window at
+    once (`start_stack_job`), after which any row is a slice of that stack.
+    Stacks larger than `max_stack_bytes` are not computed.
+    """
     def __init__(self, data_manager: PreprocessedDataManager):
         self.data_manager = data_manager
+        self.max_cached_rows = SPECTROGRAM_CACHE_ROWS
+        self.precompute_all = SPECTROGRAM_PRECOMPUTE_ALL
+        self.max_stack_bytes = SPECTROGRAM_STACK_MAX_BYTES
+        self._cache = OrderedDict()  # (window, row, nfft, overlap) -> (freqs, times, Sxx)
+        self._stack = None           # ((window, nfft, overlap), freqs, times, Sxx (nx, nf, nt))
+        self._stack_job = None
+        self._stack_job_key = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spectrogram')
 
     def update_data(self):
-        pass  # no precomputation needed
+        """New window loaded: drop the old all-channel stack, optionally start a new one."""
+        with self._lock:
+            self._stack = None
+        if self.precompute_all or self.data_manager.cursor_mode == 'h':
+            self.start_stack_job()
 
-    def calc_spectrogram(self, row_idx):
+    def _params(self):
         nfft = self.data_manager.get_user_settings('nfft') or 256
         percent_overlap = self.data_manager.get_user_settings('overlap') or 50
+        return nfft, percent_overlap
+
+    def start_stack_job(self):
+        """Compute the spectrogram of every channel of the loaded window on a worker thread."""
+        amp = self.data_manager.loaded_data['amp']
+        if amp is None:
+            return None
+        nfft, percent_overlap = self._params()
+        key = (self.data_manager.get_window_key(), nfft, percent_overlap)
+        if self.has_stack(key) or (self._stack_job_key == key and self._stack_job is not None
+                                   and not self._stack_job.done()):
+            return self._stack_job
+        nbytes = self.stack_bytes(amp.shape, amp.dtype, nfft, percent_overlap)
+        if nbytes > self.max_stack_bytes:
+            if self._stack_job_key != key:
+                print(f"All-channel spectrogram would need {nbytes / 1024**3:.1f} GiB; "
+                      f"computing rows on demand instead.")
+            self._stack_job_key, self._stack_job = key, None
+            return None
+        fs = self.data_manager.h5settings['fs']
+        self._stack_job_key = key
+        self._stack_job = self._executor.submit(self._compute_stack, key, amp, fs,
+                                                nfft, percent_overlap,
+                                                self.data_manager.window_generation)
+        return self._stack_job
+
+    @staticmethod
+    def stack_bytes(shape, dtype, nfft, percent_overlap):
+        """Size of the all-channel stack of an amp array of `shape` (channels, samples)."""
+        n_rows, n_samples = shape
+        step = nfft - int(nfft * percent_overlap / 100)
+        n_times = max(0, (n_samples - nfft) // step + 1)
+        return n_rows * (nfft // 2 + 1) * n_times * np.dtype(dtype).itemsize
+
+    def _compute_stack(self, key, amp, fs, nfft, percent_overlap, generation, rows_per_chunk=64):
+        stack = None
+        for r0 in range(0, amp.shape[0], rows_per_chunk):
+            freqs, times, Sxx = spectrogram_magnitude(amp[r0:r0+rows_per_chunk], fs,
+                                                      nfft, percent_overlap)
+            if stack is None:
+                stack = np.empty((amp.shape[0],) + Sxx.shape[1:], dtype=Sxx.dtype)
+            stack[r0:r0+rows_per_chunk] = Sxx
+            if generation != self.data_manager.window_generation:
+                return None  # amp is a view of the window buffer, which has slid since
+        with self._lock:
+            self._stack = (key, freqs, times, stack)
+        return key
+
+    def has_stack(self, key=None):
+        """True if the all-channel stack for `key` (default: current window/settings) is ready."""
+        if key is None:
+            key = (self.data_manager.get_window_key(),) + self._params()
+        with self._lock:
+            return self._stack is not None and self._stack[0] == key
+
+    def calc_spectrogram(self, row_idx):
+        nfft, percent_overlap = self._params()
+        window_key = self.data_manager.get_window_key()
+        with self._lock:
+            stack = self._stack
+        if stack is not None and stack[0] == (window_key, nfft, percent_overlap):
+            _, freqs, times, Sxx = stack
+            return freqs, times, Sxx[row_idx]
+
+        key = (window_key, int(row_idx), nfft, percent_overlap)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
         fs = self.data_manager.h5settings['fs']
         amp = self.data_manager.loaded_data['amp']
-        sig = amp[row_idx, :]
-        Noverlap = int(nfft * percent_overlap / 100)
-        window = sp.windows.tukey(nfft, .25)
-        window_rms = np.sqrt(np.sum(window**2))
-        freqs, times, Sxx = sp.spectrogram(sig,
-                                           fs=fs,
-                                           window=window,
-                                           nperseg=nfft,
-                                           noverlap=Noverlap,
-                                           scaling='spectrum',
-                                           mode='magnitude')
-        Sxx_corrected = Sxx * nfft / window_rms
-        return freqs, times, Sxx_corrected
+        result = spectrogram_magnitude(amp[row_idx, :], fs, nfft, percent_overlap)
+        self._cache[key] = result
+        while len(self._cache) > self.max_cached_rows:
+            self._cache.popitem(last=False)
+        return result
     
 
+def encode_contour(x_m, t_s):
+    """
+    Compact form of a TX contour with one point per channel:
+    (start channel, channel spacing in m, float32 time offsets as bytes).
+    Returns None if x_m isn't a run of consecutive channels.
+    """
+    x_m = np.asarray(x_m, dtype=np.float64)
+    if len(x_m) < 2 or len(x_m) != len(t_s):
+        return None
+    dx_m = float(x_m[1] - x_m[0])
+    if dx_m <= 0:
+        return None
+    ch0 = int(round(x_m[0] / dx_m))
+    if not np.allclose((ch0 + np.arange(len(x_m))) * dx_m, x_m, rtol=0, atol=1e-6 * dx_m):
+        return None
+    return ch0, dx_m, np.asarray(t_s, dtype='<f4').tobytes()
+
+
+def decode_contour(ch0, dx_m, t_blob):
+    """Inverse of `encode_contour`: (x_m, t_s) as numpy arrays."""
+    t_s = np.frombuffer(t_blob, dtype='<f4')
+    return (ch0 + np.arange(len(t_s))) * dx_m, t_s
+
+
 class LabelSaver:
     def __init__(self, db_path):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
         self.conn = sqlite3.connect(db_path)
         self.conn.execute("PRAGMA foreign_keys = ON;")  # enforce FK checks
         self.conn.execute("PRAGMA journal_mode = WAL;")
-        self._create_tables()
+        self._migrate()
+
+    def _migrate(self):
+        """
+        Bring the schema up to date. PRAGMA user_version counts the migrations
+        already applied; each one runs in its own transaction together with
+        the version bump, so an interrupted upgrade is simply retried.
+        """
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for new_version, migration in enumerate(self._MIGRATIONS[version:], start=version + 1):
+            self.conn.execute("BEGIN")
+            try:
+                migration(self)
+                self.conn.execute(f"PRAGMA user_version = {new_version}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def _add_fx_source_file(self):
+        # FX slices can come from a different file than the TX apex
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(fx_labels)")]
+        if "source_file" not in columns:
+            self.conn.execute("ALTER TABLE fx_labels ADD COLUMN source_file TEXT")
+
+    def _create_indexes(self):
+        # label lookup per display window, cascade deletes, FX lookups per dataset/time
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tx_labels_dataset_apex_time "
+                          "ON tx_labels (dataset, apex_time)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_fx_labels_tx_id ON fx_labels (tx_id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_fx_labels_dataset_t ON fx_labels (dataset, t)")
+
+    def _add_fx_start_time(self):
+        # t is seconds from the start of the displayed window, which no longer has to
+        # start at a file boundary; start_time is the absolute (unix, UTC) slice start
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(fx_labels)")]
+        if "start_time" not in columns:
+            self.conn.execute("ALTER TABLE fx_labels ADD COLUMN start_time REAL")
 
     def _create_tables(self):
         # TX table: PK = id, plus human-readable uid
@@ -338,7 +1063,61 @@ class LabelSaver:
             FOREIGN KEY (tx_id) REFERENCES tx_labels(id) ON DELETE CASCADE
         );
         """)
-        self.conn.commit()
+
+    def _add_compact_contours(self, batch_rows=10000):
+        # contours as start channel + spacing + float32 time offsets instead of JSON text
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(tx_labels)")]
+        for name, sql_type in (("contour_ch0", "INTEGER"), ("contour_dx_m", "REAL"),
+                               ("contour_t_s", "BLOB")):
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE tx_labels ADD COLUMN {name} {sql_type}")
+        # convert existing rows; contours that aren't one point per channel stay JSON
+        cur = self.conn.execute("SELECT id, x_m, t_s FROM tx_labels WHERE contour_t_s IS NULL")
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            updates = []
+            for tx_id, x_m_json, t_s_json in rows:
+                compact = encode_contour(json.loads(x_m_json), json.loads(t_s_json))
+                if compact is not None:
+                    updates.append((*compact, tx_id))
+            self.conn.executemany("""
+                UPDATE tx_labels
+                SET contour_ch0 = ?, contour_dx_m = ?, contour_t_s = ?, x_m = '', t_s = ''
+                WHERE id = ?
+            """, updates)
+
+    # version n of the schema = the first n entries; only ever append
+    _MIGRATIONS = [_create_tables, _add_fx_source_file, _create_indexes, _add_compact_contours,
+                   _add_fx_start_time]
+
+    def get_tx_labels(self, t_start, t_end, dataset):
+        """Return TX labels of `dataset` with apex time in [t_start, t_end] as a list of dicts."""
+        sql = """
+            SELECT id, uid, apex_time, apex_distance, x_m, t_s,
+                   contour_ch0, contour_dx_m, contour_t_s
+            FROM tx_labels
+            WHERE apex_time >= ? AND apex_time <= ?
+            AND dataset = ?
+        """
+        cur = self.conn.execute(sql, (t_start, t_end, dataset))
+        results = []
+        for (tx_id, uid, apex_time, apex_distance, x_m_json, t_s_json,
+             ch0, dx_m, t_blob) in cur.fetchall():
+            if t_blob is not None:
+                x_m, t_s = decode_contour(ch0, dx_m, t_blob)
+            else:
+                x_m, t_s = np.array(json.loads(x_m_json)), np.array(json.loads(t_s_json))
+            results.append({
+                "tx_id": tx_id,
+                "uid": uid,
+                "apex_time": apex_time,
+                "apex_distance": apex_distance,
+                "x_m": x_m,
+                "t_s": t_s
+            })
+        return results
 
     def remove_label_by_id(self, tx_id):
         """Delete a TX label and its associated FX labels by TX primary key ID."""
@@ -346,30 +1125,53 @@ class LabelSaver:
         self.conn.execute("DELETE FROM tx_labels WHERE id = ?", (tx_id,))
         self.conn.commit()
 
-    def save_tx_label(self, uid, apex_time, apex_time_str, apex_distance,
-                      x_m, t_s, dataset, source_file, label, label_name,
-                      saved_timestamp=None, username=None):
-        """Insert a TX label and return its DB primary key ID (tx_id)."""
-        
+    _TX_INSERT = """
+        INSERT INTO tx_labels (
+            uid, apex_time, apex_time_str, apex_distance,
+            x_m, t_s, dataset, source_file, label, label_name,
+            saved_timestamp, username,
+            contour_ch0, contour_dx_m, contour_t_s
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    _FX_INSERT = """
+        INSERT INTO fx_labels (
+            tx_id, uid, f_min_hz, f_max_hz, x_min_m, x_max_m,
+            t, win_length_s, dataset, label, label_name,
+            saved_timestamp, username, source_file, start_time
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def _stamp(saved_timestamp, username):
         if saved_timestamp is None:
             saved_timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
         if username is None:
             username = getpass.getuser()
+        return saved_timestamp, username
 
-        cursor = self.conn.execute("""
-            INSERT INTO tx_labels (
-                uid, apex_time, apex_time_str, apex_distance,
-                x_m, t_s, dataset, source_file, label, label_name,
-                saved_timestamp, username
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            uid, apex_time, apex_time_str, apex_distance,
-            json.dumps(x_m), json.dumps(t_s),
-            os.path.basename(dataset),
-            os.path.abspath(source_file),
-            label, label_name,
-            saved_timestamp, username
-        ))
+    def _tx_row(self, uid, apex_time, apex_time_str, apex_distance, x_m, t_s, dataset,
+                source_file, label, label_name, saved_timestamp, username):
+        compact = encode_contour(x_m, t_s)
+        if compact is None:  # not one point per channel: keep the JSON lists
+            x_m_json, t_s_json = json.dumps(list(map(float, x_m))), json.dumps(list(map(float, t_s)))
+            compact = (None, None, None)
+        else:
+            x_m_json, t_s_json = '', ''
+        return (uid, apex_time, apex_time_str, apex_distance,
+                x_m_json, t_s_json,
+                os.path.basename(dataset),
+                os.path.abspath(source_file),
+                label, label_name,
+                saved_timestamp, username, *compact)
+
+    def save_tx_label(self, uid, apex_time, apex_time_str, apex_distance,
+                      x_m, t_s, dataset, source_file, label, label_name,
+                      saved_timestamp=None, username=None):
+        """Insert a TX label and return its DB primary key ID (tx_id)."""
+        saved_timestamp, username = self._stamp(saved_timestamp, username)
+        cursor = self.conn.execute(self._TX_INSERT, self._tx_row(
+            uid, apex_time, apex_time_str, apex_distance, x_m, t_s, dataset,
+            source_file, label, label_name, saved_timestamp, username))
         self.conn.commit()
 
         return cursor.lastrowid  # Return DB PK to use in FX labels
@@ -379,22 +1181,115 @@ class LabelSaver:
                       saved_timestamp=None, username=None):
         """Insert an FX label linked to its parent TX label via tx_id (DB PK) and also store uid."""
         print('fmin:', f_min_hz, 'fmax:', f_max_hz, 'xmin:', x_min_m, 'xmax:', x_max_m)
-        if saved_timestamp is None:
-            saved_timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        if username is None:
-            username = getpass.getuser()
-
-        self.conn.execute("""
-            INSERT INTO fx_labels (
-                tx_id, uid, f_min_hz, f_max_hz, x_min_m, x_max_m,
-                t, win_length_s, dataset, label, label_name,
-                saved_timestamp, username
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        saved_timestamp, username = self._stamp(saved_timestamp, username)
+        self.conn.execute(self._FX_INSERT, (
             tx_id, uid, f_min_hz, f_max_hz, x_min_m, x_max_m,
             t, win_length_s,
             os.path.basename(dataset),
             label, label_name,
-            saved_timestamp, username
+            saved_timestamp, username, None, None
         ))
-        self.conn.commit()
\ No newline at end of file
+        self.conn.commit()
+
+    def save_label(self, uid, apex_time, apex_time_str, apex_distance,
+                   x_m, t_s, dataset, source_file, label, label_name,
+                   fx_labels=(), saved_timestamp=None, username=None):
+        """
+        Insert a TX label and all its FX labels in one transaction; return tx_id.
+
+        fx_labels : iterable of dicts with f_min_hz, f_max_hz, x_min_m, x_max_m,
+            t (s from the start of the displayed window), win_length_s and
+            optionally source_file (the file holding the slice) and start_time
+            (absolute unix time of the slice start, UTC like apex_time).
+            Either everything is written or, on any error, nothing is.
+        """
+        saved_timestamp, username = self._stamp(saved_timestamp, username)
+        dataset_name = os.path.basename(dataset)
+        with self.conn:  # commits once at the end, rolls back on exceptions
+            cursor = self.conn.execute(self._TX_INSERT, self._tx_row(
+                uid, apex_time, apex_time_str, apex_distance, x_m, t_s, dataset,
+                source_file, label, label_name, saved_timestamp, username))
+            tx_id = cursor.lastrowid
+            self.conn.executemany(self._FX_INSERT, [
+                (tx_id, uid, fx['f_min_hz'], fx['f_max_hz'], fx['x_min_m'], fx['x_max_m'],
+                 fx['t'], fx['win_length_s'], dataset_name, label, label_name,
+                 saved_timestamp, username,
+                 os.path.abspath(fx['source_file']) if fx.get('source_file') else None,
+                 fx.get('start_time'))
+                for fx in fx_labels])
+        return tx_id
+
+
+class LabelWriter(QObject):
+    """
+    Runs LabelSaver calls on a dedicated thread, one at a time in submission order.
+
+    The SQLite connection lives on that thread, so slow disks or network
+    shares never block the GUI. Results come back through `finished` (and the
+    optional per-call callback, run on the GUI thread); exceptions through
+    `failed`. Because calls run in order, a query submitted after a write
+    sees that write. `close()` writes everything still queued before returning.
+    """
+    finished = pyqtSignal(int, str, object)  # request id, LabelSaver method, result
+    failed = pyqtSignal(int, str, str)       # request id, LabelSaver method, error message
+
+    def __init__(self, db_path):
+        super().__init__()
+        self.db_path = db_path
+        self._queue = queue.Queue()
+        self._callbacks = {}  # request id -> callback; only touched on the GUI thread
+        self._next_id = 0
+        self.finished.connect(self._run_callback)
+        self.failed.connect(lambda request_id, *_: self._callbacks.pop(request_id, None))
+        self._thread = threading.Thread(target=self._run, name='label-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, method, *args, callback=None, **kwargs):
+        """Queue LabelSaver.`method`(*args, **kwargs); returns the request id."""
+        self._next_id += 1
+        if callback is not None:
+            self._callbacks[self._next_id] = callback
+        self._queue.put((self._next_id, method, args, kwargs))
+        return self._next_id
+
+    def flush(self):
+        """Block until every queued call has run."""
+        self._queue.join()
+
+    def close(self):
+        """Run the remaining calls, then close the database and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run_callback(self, request_id, method, result):
+        callback = self._callbacks.pop(request_id, None)
+        if callback is not None:
+            callback(result)
+
+    def _run(self):
+        try:
+            saver = LabelSaver(self.db_path)
+        except Exception as e:
+            print(f"Could not open label database {self.db_path}: {e}")
+            saver = None
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                request_id, method, args, kwargs = item
+                if saver is None:
+                    self.failed.emit(request_id, method, f"could not open {self.db_path}")
+                    continue
+                try:
+                    result = getattr(saver, method)(*args, **kwargs)
+                except Exception as e:
+                    print(f"Label database {method} failed: {e}")
+                    self.failed.emit(request_id, method, str(e))
+                else:
+                    self.finished.emit(request_id, method, result)
+            finally:
+                self._queue.task_done()
+        if saver is not None:
+            saver.conn.close()
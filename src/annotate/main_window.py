@@ -95,15 +95,23 @@ class MainWindow(QMainWindow):
         self.fx_plot_panel.plot_widget.getPlotItem().setYLink(self.tx_plot_panel.plot_widget)
         self.tx_plot_panel.point_clicked.connect(self.on_point_clicked)
         self.fx_plot_panel.point_clicked.connect(self.on_point_clicked)
+        self.fx_plot_panel.slice_rois_changed.connect(self.fx_series_panel.redraw_slice_rois)
         self.tx_plot_panel.label_delete_requested.connect(self.on_delete_label)
+        self.tx_plot_panel.row_hovered.connect(self.spectrogram_panel.hover_row)
+        self.fx_plot_panel.row_hovered.connect(self.spectrogram_panel.hover_row)
+        self.spectrogram_panel.hover_latency_report.connect(self.text_display_panel.update_info_text)
 
         # === Navigation buttons ===
-        self.control_panel.btn_back.clicked.connect(lambda: self.data_manager.navigate('backward'))
-        self.control_panel.btn_forward.clicked.connect(lambda: self.data_manager.navigate('forward'))
+        self.control_panel.btn_back.clicked.connect(
+            lambda: self.data_manager.navigate('backward', self.control_panel.get_nav_step()))
+        self.control_panel.btn_forward.clicked.connect(
+            lambda: self.data_manager.navigate('forward', self.control_panel.get_nav_step()))
 
         # === Apply Changes button and Add Labels button ===
         self.control_panel.toggle_labels_requested.connect(self.on_toggle_labels)
         self.control_panel.refresh_requested.connect(self.on_apply_changes)
+        self.control_panel.goto_requested.connect(self.on_goto_start_time)
+        self.data_manager.label_db_error.connect(self.statusBar().showMessage)
 
         # Build menu
         self.create_menu()
@@ -125,20 +133,43 @@ class MainWindow(QMainWindow):
 
             labels_path = settings.get('labels_file_path')
             if labels_path:
-                from annotate.data_manager import LabelSaver
-                self.data_manager.label_saver = LabelSaver(labels_path)
+                self.data_manager.set_labels_db(labels_path)
 
             self.data_manager.new_file_selected(filepath)
 
     def on_apply_changes(self):
-        """When user clicks Apply Changes: store settings + recompute FX."""
+        """When user clicks Apply Changes: store settings, reload the window (new duration) + recompute FX."""
         settings = self.control_panel.get_settings()
         self.data_manager.apply_user_settings(settings)
-        self.data_manager.load_current_window(recompute_fx=True)
+        if self.data_manager.directory:
+            self.data_manager.load_current_window(recompute_fx=True)
         labels_path = settings.get('labels_file_path')
         if labels_path:
-            from annotate.data_manager import LabelSaver
-            self.data_manager.label_saver = LabelSaver(labels_path)
+            self.data_manager.set_labels_db(labels_path)
+
+    def on_goto_start_time(self):
+        """Load the window given by the start time / duration fields."""
+        if not self.data_manager.directory:
+            self.statusBar().showMessage("Select a preprocessed dataset first")
+            return
+        settings = self.control_panel.get_settings()
+        if not settings['start_time'].strip():
+            # empty start time: start of the selected file
+            start_timestamp = self.data_manager.selected_file_timestamp()
+        else:
+            try:
+                start = datetime.fromisoformat(settings['start_time'])
+            except ValueError:
+                self.statusBar().showMessage(f"Could not read start time '{settings['start_time']}'")
+                return
+            if start.tzinfo is None:
+                start = start.replace(tzinfo=timezone.utc)
+            start_timestamp = start.timestamp()
+        self.data_manager.apply_user_settings(settings)
+        try:
+            self.data_manager.load_window(start_timestamp, settings['duration_s'])
+        except ValueError as e:
+            self.statusBar().showMessage(str(e))
 
     def on_fx_slice_selected(self, idx):
         """User clicked an FX series thumbnail."""
@@ -158,6 +189,10 @@ class MainWindow(QMainWindow):
         if hasattr(self.spectrogram_panel, "last_row_idx") and self.spectrogram_panel.last_row_idx is not None:
             self.spectrogram_panel.highlight_time_window(t_start, t_end)
 
+    def closeEvent(self, event):
+        self.data_manager.close()
+        super().closeEvent(event)
+
     def keyPressEvent(self, event):
         if event.key() == QtCore.Qt.Key.Key_S:
             # Spectrogram row selection mode
@@ -165,13 +200,25 @@ class MainWindow(QMainWindow):
             self.data_manager.set_cursor_mode(self.cursor_mode)
             self.text_display_panel.update_cursor_mode("select spectrogram row")
             self.statusBar().showMessage("Spectrogram selection: Click a T-X or F-X plot")
+        elif event.key() == QtCore.Qt.Key.Key_H:
+            # Hover spectrogram mode: spectrogram follows the mouse row (toggle)
+            if self.cursor_mode == 'h':
+                self.cursor_mode = ''
+                self.data_manager.set_cursor_mode(self.cursor_mode)
+                self.text_display_panel.update_cursor_mode("Normal")
+                self.statusBar().showMessage(self.spectrogram_panel.hover_monitor.summary())
+            elif self.cursor_mode != 'annotation':
+                self.cursor_mode = 'h'
+                self.data_manager.set_cursor_mode(self.cursor_mode)
+                self.spectrogram_panel.start_hover_mode()
+                self.text_display_panel.update_cursor_mode("hover spectrogram ('h' to stop)")
+                self.statusBar().showMessage("Hover spectrogram: move over a T-X or F-X plot")
         elif event.key() == QtCore.Qt.Key.Key_A:
             # Annotation mode
             settings = self.control_panel.get_settings()
             labels_path = settings.get('labels_file_path')
             if labels_path:
-                from annotate.data_manager import LabelSaver
-                self.data_manager.label_saver = LabelSaver(labels_path)
+                self.data_manager.set_labels_db(labels_path)
             if self.cursor_mode != 'annotation':
                 self.clear_all_annotation_overlays()
                 # Start annotation mode
@@ -216,8 +263,9 @@ class MainWindow(QMainWindow):
                     )
                     
                 elif self.annotation_stage == 'adjust_fx_energy':
-                    all_coords = self.fx_series_panel.get_all_rois_coordinates()
-                    self.data_manager.annotation_fx_boxes_per_plot = all_coords
+                    # (slice index, box) pairs, so each box is saved with its own slice time
+                    self.data_manager.annotation_fx_boxes_per_plot = \
+                        self.fx_series_panel.get_rois_by_slice()
                     # proceed to label assignment:
                     self.annotation_stage = 'assign_label'
                     self.text_display_panel.update_cursor_mode(
@@ -255,8 +303,7 @@ class MainWindow(QMainWindow):
                 # ===== Generate UID for this detection =====
                 if not hasattr(self.data_manager, 'annotation_uid'):
                     self.data_manager.annotation_uid = str(uuid.uuid4())
-                self.data_manager.label_saver
-                if self.data_manager.label_saver:
+                if self.data_manager.label_writer:
                     # ===== Save TX label =====
                     # Apex time absolute Unix timestamp from apex selection
                     apex_unix = float(self.data_manager.loaded_data['time_stamps'][0]) + self.tx_apex_point[0]
@@ -266,10 +313,30 @@ class MainWindow(QMainWindow):
                     dist_vec = list(map(float, [x for t, x in self.tx_contour_points]))
 
                     dataset_name = os.path.basename(self.data_manager.directory)
-                    source_file = self.data_manager.filepath
-
-                    # Save TX label and get tx_id (DB PK)
-                    tx_id = self.data_manager.label_saver.save_tx_label(
+                    source_file = self.data_manager.source_file_at(self.tx_apex_point[0])
+
+                    # FX boxes, each at the start time of the slice it was drawn on
+                    # (t: s from the window start; start_time: absolute, like apex_unix)
+                    fx_labels = []
+                    fx_times = self.data_manager.fx_manager.get_dataset()["t"]
+                    win_s = self.data_manager.get_user_settings('win_s') or 2.0
+                    for slice_idx, coords in getattr(self.data_manager, 'annotation_fx_boxes_per_plot', []):
+                        f_min_hz, x_min_m, f_max_hz, x_max_m = coords
+                        start_t = float(fx_times[slice_idx]) if slice_idx < len(fx_times) else 0.0
+                        fx_labels.append({
+                            'f_min_hz': f_min_hz,
+                            'f_max_hz': f_max_hz,
+                            'x_min_m': x_min_m,
+                            'x_max_m': x_max_m,
+                            't': start_t,
+                            'win_length_s': win_s,
+                            'source_file': self.data_manager.source_file_at(start_t),
+                            'start_time': float(self.data_manager.loaded_data['time_stamps'][0]) + start_t,
+                        })
+
+                    # TX label and its FX labels in one transaction, written in the background
+                    self.data_manager.label_writer.submit(
+                        'save_label',
                         uid=self.data_manager.annotation_uid,
                         apex_time=apex_unix,
                         apex_time_str=apex_str,
@@ -279,33 +346,14 @@ class MainWindow(QMainWindow):
                         dataset=dataset_name,
                         source_file=source_file,
                         label=label_num,
-                        label_name=label_name
+                        label_name=label_name,
+                        fx_labels=fx_labels,
+                        callback=lambda tx_id, n_fx=len(fx_labels): self.statusBar().showMessage(
+                            f"Saved label {tx_id} with {n_fx} F-X boxes")
                     )
-
-                    # Save FX labels linked by tx_id and with same uid for external reference
-                    if hasattr(self.data_manager, 'annotation_fx_boxes_per_plot'):
-                        for idx, coords in enumerate(self.data_manager.annotation_fx_boxes_per_plot):
-                            f_min_hz, x_min_m, f_max_hz, x_max_m = coords
-                            fx_dataset = self.data_manager.fx_manager.get_dataset()
-                            start_t = fx_dataset["t"][idx] if idx < len(fx_dataset["t"]) else 0.0
-                            win_s = self.data_manager.get_user_settings('win_s') or 2.0
-
-                            self.data_manager.label_saver.save_fx_label(
-                                tx_id=tx_id,
-                                uid=self.data_manager.annotation_uid,
-                                f_min_hz=f_min_hz,
-                                f_max_hz=f_max_hz,
-                                x_min_m=x_min_m,
-                                x_max_m=x_max_m,
-                                t=start_t,
-                                win_length_s=win_s,
-                                dataset=dataset_name,
-                                label=label_num,
-                                label_name=label_name
-                            )
                             
                 self.statusBar().showMessage(
-                    f"Assigned label {label_num} and saved TX + FX annotations"
+                    f"Assigned label {label_num}; saving TX + FX annotations"
                 )
 
                 # End annotation mode
@@ -354,24 +402,29 @@ class MainWindow(QMainWindow):
     def on_toggle_labels(self, show):
         """Show or hide existing TX labels in current time window."""
         if show:
-            labels = self.data_manager.get_labels_in_current_window()
-            self.tx_plot_panel.show_existing_labels(labels)
-            self.statusBar().showMessage(f"Showing {len(labels)} existing labels in window")
             self.control_panel.toggle_labels_button.setText("Hide Existing Labels")
             self.show_labels = True
+            self.data_manager.request_labels_in_current_window(self._show_existing_labels)
         else:
             self.tx_plot_panel.hide_existing_labels()
             self.statusBar().showMessage("Existing labels hidden")
             self.control_panel.toggle_labels_button.setText("Show Existing Labels")
             self.show_labels = False
     
+    def _show_existing_labels(self, labels):
+        """Query result of existing labels; ignored if they were hidden meanwhile."""
+        if not self.show_labels:
+            return
+        self.tx_plot_panel.show_existing_labels(labels)
+        self.statusBar().showMessage(f"Showing {len(labels)} existing labels in window")
+
     def on_delete_label(self, tx_id):
         """Remove label from DB and refresh overlays."""
-        if self.data_manager.label_saver:
-            self.data_manager.label_saver.remove_label_by_id(tx_id)
-            refreshed = self.data_manager.get_labels_in_current_window()
-            self.tx_plot_panel.show_existing_labels(refreshed)
-            self.statusBar().showMessage(f"Removed label {tx_id}")
+        if self.data_manager.label_writer:
+            self.data_manager.label_writer.submit(
+                'remove_label_by_id', tx_id,
+                callback=lambda _: self.statusBar().showMessage(f"Removed label {tx_id}"))
+            self.data_manager.request_labels_in_current_window(self._show_existing_labels)
     
     def clear_all_annotation_overlays(self):
         self.tx_plot_panel.clear_annotation_overlays()
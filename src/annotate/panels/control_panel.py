@@ -1,7 +1,7 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QGroupBox, QFormLayout, QHBoxLayout,
     QPushButton, QDoubleSpinBox, QSpinBox, QSlider, QLineEdit, QLabel,
-    QFileDialog
+    QFileDialog, QComboBox, QCheckBox
 )
 from PyQt6.QtCore import Qt, pyqtSignal
 from annotate.config import (
@@ -12,6 +12,7 @@ from annotate.config import (
 class ControlPanel(QWidget):
     refresh_requested = pyqtSignal()
     toggle_labels_requested = pyqtSignal(bool)
+    goto_requested = pyqtSignal()
 
     def __init__(self, data_manager):
         super().__init__()
@@ -22,13 +23,48 @@ class ControlPanel(QWidget):
         # --- Navigation ---
         nav_box = QGroupBox("Navigation")
         nav_layout = QHBoxLayout()
-        self.btn_back = QPushButton("< 30s")
-        self.btn_forward = QPushButton("> 30s")
+        self.btn_back = QPushButton()
+        self.btn_forward = QPushButton()
+        self.step_combo = QComboBox()
+        self.step_combo.addItems(["5", "10", "30", "60"])
+        self.step_combo.setCurrentText(f"{defaults.nav_step_s:g}")
+        self.step_combo.setToolTip("navigation step (s)")
+        self.step_combo.currentTextChanged.connect(self._update_nav_buttons)
+        self._update_nav_buttons()
         nav_layout.addWidget(self.btn_back)
+        nav_layout.addWidget(self.step_combo)
         nav_layout.addWidget(self.btn_forward)
         nav_box.setLayout(nav_layout)
         main_layout.addWidget(nav_box)
 
+        # --- Window ---
+        window_box = QGroupBox("Window")
+        window_form = QFormLayout()
+        self.start_time_edit = QLineEdit()
+        self.start_time_edit.setText(defaults.start_time)
+        self.start_time_edit.setPlaceholderText("YYYY-MM-DD HH:MM:SS (UTC)")
+        window_form.addRow("Start time", self.start_time_edit)
+        self.duration_spin = QDoubleSpinBox()
+        self.duration_spin.setRange(1, 3600)
+        self.duration_spin.setValue(defaults.duration_s)
+        window_form.addRow("Duration (s)", self.duration_spin)
+        self.x_min_spin = QDoubleSpinBox()
+        self.x_min_spin.setRange(0, 1e6)
+        self.x_min_spin.setDecimals(1)
+        self.x_min_spin.setValue(defaults.x_min_m)
+        window_form.addRow("Distance from (m)", self.x_min_spin)
+        self.x_max_spin = QDoubleSpinBox()
+        self.x_max_spin.setRange(0, 1e6)
+        self.x_max_spin.setDecimals(1)
+        self.x_max_spin.setSpecialValueText("end")
+        self.x_max_spin.setValue(defaults.x_max_m)
+        window_form.addRow("Distance to (m)", self.x_max_spin)
+        self.goto_button = QPushButton("Go to start time")
+        self.goto_button.clicked.connect(self.goto_requested.emit)
+        window_form.addRow(self.goto_button)
+        window_box.setLayout(window_form)
+        main_layout.addWidget(window_box)
+
         # --- T-X Settings ---
         tx_box = QGroupBox("T-X Settings")
         tx_form = QFormLayout()
@@ -51,6 +87,15 @@ class ControlPanel(QWidget):
         self.fx_win_s_spin.setValue(defaults.fx_win_s)
         fx_form.addRow("FX window size (s)", self.fx_win_s_spin)
 
+        self.fx_overlap_spin = QSpinBox()
+        self.fx_overlap_spin.setRange(0, 90)
+        self.fx_overlap_spin.setValue(int(defaults.fx_overlap))
+        fx_form.addRow("FX % overlap", self.fx_overlap_spin)
+
+        self.fx_mosaic_check = QCheckBox("Mosaic thumbnails")
+        self.fx_mosaic_check.setChecked(defaults.fx_mosaic)
+        fx_form.addRow("FX series", self.fx_mosaic_check)
+
         self.fx_vmin_slider = QSlider(Qt.Orientation.Horizontal)
         self.fx_vmax_slider = QSlider(Qt.Orientation.Horizontal)
         for slider, val in [(self.fx_vmin_slider, defaults.fx_vmin),
@@ -91,6 +136,20 @@ class ControlPanel(QWidget):
         spec_box.setLayout(spec_form)
         main_layout.addWidget(spec_box)
 
+        # --- Processing Settings ---
+        proc_box = QGroupBox("Processing")
+        proc_form = QFormLayout()
+        self.precision_combo = QComboBox()
+        self.precision_combo.addItems(["float32", "float64"])
+        self.precision_combo.setCurrentText(defaults.precision)
+        proc_form.addRow("Precision", self.precision_combo)
+        self.lowpass_combo = QComboBox()
+        self.lowpass_combo.addItems(["butterworth", "cosine", "filtfilt"])
+        self.lowpass_combo.setCurrentText(defaults.lowpass)
+        proc_form.addRow("Lowpass", self.lowpass_combo)
+        proc_box.setLayout(proc_form)
+        main_layout.addWidget(proc_box)
+
         # --- Labels Section ---
         labels_box = QGroupBox("Labels")
         labels_form = QFormLayout()
@@ -129,6 +188,15 @@ class ControlPanel(QWidget):
 
         main_layout.addStretch()
 
+    def _update_nav_buttons(self):
+        step = self.step_combo.currentText()
+        self.btn_back.setText(f"< {step}s")
+        self.btn_forward.setText(f"> {step}s")
+
+    def get_nav_step(self):
+        """Navigation step in seconds."""
+        return float(self.step_combo.currentText())
+
     def _toggle_labels_clicked(self, checked):
         """Emit signal when user toggles label visibility."""
         self.toggle_labels_requested.emit(checked)
@@ -147,7 +215,14 @@ class ControlPanel(QWidget):
     def get_settings(self):
         """Return current UI values as a dict."""
         settings = {
+            'start_time': self.start_time_edit.text().strip(),
+            'duration_s': self.duration_spin.value(),
+            'nav_step_s': self.get_nav_step(),
+            'x_min_m': self.x_min_spin.value(),
+            'x_max_m': self.x_max_spin.value(),
             'win_s': self.fx_win_s_spin.value(),
+            'fx_overlap': self.fx_overlap_spin.value(),
+            'fx_mosaic': self.fx_mosaic_check.isChecked(),
             'nfft': self.nfft_spin.value(),
             'overlap': self.overlap_spin.value(),
             'tx_vmin': self.tx_vmin_slider.value(),
@@ -156,6 +231,8 @@ class ControlPanel(QWidget):
             'fx_vmax': self.fx_vmax_slider.value(),
             'spec_vmin': self.spec_vmin_slider.value(),
             'spec_vmax': self.spec_vmax_slider.value(),
+            'precision': self.precision_combo.currentText(),
+            'lowpass': self.lowpass_combo.currentText(),
             'labels_file_path': self.labels_path_edit.text().strip() 
         }
         # Label mapping
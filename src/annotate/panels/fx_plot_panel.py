@@ -10,6 +10,8 @@ class FXPlotPanel(QWidget):
     Large single FX plot view.
     """
     point_clicked = pyqtSignal(int, int)  # row index, col index
+    row_hovered = pyqtSignal(int)         # row index under the mouse in hover mode
+    slice_rois_changed = pyqtSignal(int)  # slice index whose stored ROIs were added/deleted
 
     def __init__(self, data_manager, vmin=0, vmax=0.4):
         super().__init__()
@@ -41,6 +43,7 @@ class FXPlotPanel(QWidget):
 
         # Connect mouse clicks
         self.plot_widget.scene().sigMouseClicked.connect(self.on_mouse_click)
+        self.plot_widget.scene().sigMouseMoved.connect(self.on_mouse_move)
 
     #############################
     # Plotting and updating
@@ -85,11 +88,12 @@ class FXPlotPanel(QWidget):
 
         self.img_item.setImage(img_data, levels=levels)
         f0, f1 = freq[0], freq[-1]
-        x0, x1 = x[0], x[-1]
-        width, height = img_data.shape[1], img_data.shape[0]
+        x0 = x[0]
+        width = img_data.shape[1]
         tr = pg.QtGui.QTransform()
-        tr.scale((f1 - f0) / width, (x1 - x0) / height)
+        # translate first: the offset is in plot units, not in image pixels
         tr.translate(f0, x0)
+        tr.scale((f1 - f0) / width, self.data_manager.h5settings['dx'])
         self.freq_band = [f0, f1]
         self.img_item.setTransform(tr)
 
@@ -173,6 +177,7 @@ class FXPlotPanel(QWidget):
                 coords_list = self.data_manager.annotation_rois_per_slice.get(self.current_slice_idx, [])
                 if idx < len(coords_list):
                     coords_list.pop(idx)
+                self.slice_rois_changed.emit(self.current_slice_idx)
 
         # Ctrl+Shift-click = add
         elif ev.modifiers() == (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier):
@@ -189,6 +194,16 @@ class FXPlotPanel(QWidget):
             self.fx_slice_rois.append(roi)
             coords_list = self.data_manager.annotation_rois_per_slice.setdefault(self.current_slice_idx, [])
             coords_list.append((roi_pos[0], roi_pos[1], roi_pos[0] + w, roi_pos[1] + h))
+            self.slice_rois_changed.emit(self.current_slice_idx)
+
+    def on_mouse_move(self, scene_pos):
+        if self.data_manager.cursor_mode != 'h':
+            return
+        x = self.data_manager.fx_manager.get_dataset()["x"]
+        if x is None:
+            return
+        mp = self.plot_widget.getPlotItem().vb.mapSceneToView(scene_pos)
+        self.row_hovered.emit(int(np.argmin(np.abs(x - mp.y()))))
 
     ###############################
     # Other
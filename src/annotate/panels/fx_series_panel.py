@@ -1,24 +1,46 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QScrollArea, QGraphicsRectItem
-from PyQt6.QtCore import pyqtSignal, Qt
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QScrollArea
+from PyQt6.QtCore import pyqtSignal, QEvent
+from concurrent.futures import ThreadPoolExecutor
 import pyqtgraph as pg
 import numpy as np
 from annotate.config import PLOTCOLOR_LUT, UserSettings
 
 class FXSeriesPanel(QWidget):
+    """
+    Scrollable list of FX thumbnails, one per slice.
+
+    The list is virtualized: a small pool of plot widgets is positioned over
+    the rows that are visible in the scroll area and re-bound to other slices
+    while scrolling, so the widget count does not grow with the slice count.
+    Annotation ROIs live in `data_manager.annotation_rois_per_slice` and are
+    drawn on whichever widget currently shows their slice.
+
+    In mosaic mode (`fx_mosaic` setting) all slices are instead rendered into
+    one pre-colormapped image on a worker thread and shown as a single image;
+    clicking a tile selects its slice. While per-slice annotation ROIs are
+    shown the panel falls back to the list, where they can be seen and edited.
+    """
     slice_selected = pyqtSignal(int)
+    _mosaic_ready = pyqtSignal(int, object, int, int)  # token, RGBA image, tile pitch, tile rows
 
-    def __init__(self, data_manager):
+    def __init__(self, data_manager, row_height=180, row_spacing=6):
         super().__init__()
         self.data_manager = data_manager
         self.vmin = UserSettings.fx_vmin
         self.vmax = UserSettings.fx_vmax
         self.use_db = False
+        self.row_height = row_height
+        self.row_spacing = row_spacing
 
         self.data_manager.dataset_loaded.connect(self.on_dataset_loaded)
 
-        self.plot_widgets = []
-        self.plot_img_items = []
-        self.fx_rois = []  # keep track of adjustable ROIs
+        self.dataset = None
+        self.levels = None
+        self.n_slices = 0
+        self.plot_widgets = []      # widget pool
+        self.plot_img_items = []    # image item of each pooled widget
+        self.bound_idx = []         # slice shown by each pooled widget (None = unused)
+        self.widget_rois = []       # ROIs currently drawn on each pooled widget
         self.highlight_idx = None
 
         outer_layout = QVBoxLayout(self)
@@ -27,9 +49,40 @@ class FXSeriesPanel(QWidget):
         self.scroll_area.setWidgetResizable(True)
         outer_layout.addWidget(self.scroll_area)
 
+        # rows are positioned by hand, so the container has no layout
         self.container_widget = QWidget()
-        self.container_layout = QVBoxLayout(self.container_widget)
         self.scroll_area.setWidget(self.container_widget)
+        self.container_widget.installEventFilter(self)
+        self.scroll_area.viewport().installEventFilter(self)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self._update_visible)
+
+        # Mosaic view: one image item, filled from a worker thread
+        self.use_mosaic = False
+        self.showing_rois = False  # annotation ROIs placed: list view regardless of use_mosaic
+        self.mosaic_view = pg.GraphicsLayoutWidget()
+        self.mosaic_view.setBackground('w')
+        self.mosaic_vb = self.mosaic_view.addViewBox()
+        self.mosaic_vb.invertY(True)
+        self.mosaic_vb.setMouseEnabled(x=False, y=True)
+        self.mosaic_img = pg.ImageItem(axisOrder='row-major')
+        self.mosaic_vb.addItem(self.mosaic_img)
+        self.mosaic_highlight = pg.QtWidgets.QGraphicsRectItem()
+        self.mosaic_highlight.setPen(pg.mkPen('r', width=3))
+        self.mosaic_highlight.setVisible(False)
+        self.mosaic_vb.addItem(self.mosaic_highlight)
+        self.mosaic_view.scene().sigMouseClicked.connect(self._on_mosaic_clicked)
+        self.mosaic_view.hide()
+        outer_layout.addWidget(self.mosaic_view)
+        self.mosaic_pitch = None
+        self.mosaic_tile_rows = None
+        self._mosaic_token = 0
+        self._mosaic_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fx_mosaic')
+        self._mosaic_ready.connect(self._show_mosaic)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Resize:
+            self._update_visible()
+        return super().eventFilter(obj, event)
 
     def on_dataset_loaded(self):
         self.update_settings()
@@ -41,26 +94,15 @@ class FXSeriesPanel(QWidget):
         self.vmin = user_settings.get('fx_vmin', self.vmin)
         self.vmax = user_settings.get('fx_vmax', self.vmax)
         self.use_db = user_settings.get('fx_use_db', self.use_db)
+        self.use_mosaic = user_settings.get('fx_mosaic', self.use_mosaic)
 
     def set_plot_data(self, dataset):
         if not dataset or dataset["amp"] is None:
             return
 
         amp = dataset["amp"]
-        freq = dataset["freq"]
-        x = dataset["x"]
-        times = dataset["t"]
-        nt = amp.shape[0]
-
-        # Clear existing
-        while self.container_layout.count():
-            item = self.container_layout.takeAt(0)
-            w = item.widget()
-            if w:
-                w.deleteLater()
-        self.plot_widgets.clear()
-        self.plot_img_items.clear()
-        self.fx_rois.clear()
+        self.dataset = dataset
+        self.n_slices = amp.shape[0]
         self.highlight_idx = None
 
         # Determine levels
@@ -68,52 +110,216 @@ class FXSeriesPanel(QWidget):
             levels = (self.vmin, self.vmax)
         else:
             levels = (np.nanmin(amp), np.nanmax(amp))
-
         if self.use_db:
-            amp = 20*np.log10(np.maximum(amp, 1e-12))
             levels = (20*np.log10(max(levels[0], 1e-12)),
                       20*np.log10(max(levels[1], 1e-12)))
+        self.levels = levels
+
+        mosaic = self._mosaic_shown()
+        self.scroll_area.setVisible(not mosaic)
+        self.mosaic_view.setVisible(mosaic)
+        if mosaic:
+            for i in range(len(self.plot_widgets)):
+                self._unbind(i)
+            self._mosaic_token += 1
+            self._mosaic_executor.submit(self._render_mosaic_job, self._mosaic_token,
+                                         amp, levels, self.use_db)
+            return
 
-        # Build per-slice plot widgets
-        for idx in range(nt):
-            plot_widget = pg.PlotWidget()
-            plot_widget.setBackground('w')
-            plot_widget.setMinimumHeight(180)
-            plot_item = plot_widget.getPlotItem()
-            plot_item.setLabel('bottom', 'frequency', units='Hz')
-            plot_item.setLabel('left', 'cable distance', units='m')
-            plot_item.setTitle(f"T = {times[idx]:.2f} s")
-
-            img_item = pg.ImageItem(axisOrder='row-major')
-            img_item.setLookupTable(PLOTCOLOR_LUT)
-            img_data = amp[idx, :, :]
-
-            img_item.setImage(img_data, levels=levels)
-
-            # Coordinate transform
-            f0, f1 = freq[0], freq[-1]
-            x0, x1 = x[0], x[-1]
-            width, height = img_data.shape[1], img_data.shape[0]
-            tr = pg.QtGui.QTransform()
-            tr.scale((f1 - f0) / width, (x1 - x0) / height)
-            tr.translate(f0, x0)
-            img_item.setTransform(tr)
-
-            plot_widget.addItem(img_item)
-
-            plot_widget.scene().sigMouseClicked.connect(
-                lambda evt, idx=idx: self.slice_selected.emit(idx)
-            )
-
-            self.container_layout.addWidget(plot_widget)
-            self.plot_widgets.append(plot_widget)
-            self.plot_img_items.append(img_item)
+        self.container_widget.setMinimumHeight(self.n_slices * (self.row_height + self.row_spacing))
+        self.bound_idx = [None] * len(self.plot_widgets)  # force every widget to re-bind
+        self._update_visible()
+
+    #####################################################################
+    # Mosaic mode
+    #####################################################################
+    def _mosaic_shown(self):
+        return self.use_mosaic and not self.showing_rois
+
+    def _render_mosaic_job(self, token, amp, levels, use_db):
+        """Worker thread: colormap all slices into one RGBA image."""
+        try:
+            mosaic, pitch, tile_rows = render_fx_mosaic(amp, levels, use_db, PLOTCOLOR_LUT)
+        except Exception as e:
+            print(f"Error rendering FX mosaic: {e}")
+            return
+        self._mosaic_ready.emit(token, mosaic, pitch, tile_rows)
+
+    def _show_mosaic(self, token, mosaic, pitch, tile_rows):
+        if token != self._mosaic_token:
+            return  # a newer dataset has been loaded since this job started
+        self.mosaic_pitch = pitch
+        self.mosaic_tile_rows = tile_rows
+        self.mosaic_img.setImage(mosaic, autoLevels=False)
+        width = mosaic.shape[1]
+        self.mosaic_vb.setLimits(xMin=0, xMax=width, yMin=0, yMax=mosaic.shape[0])
+        self.mosaic_vb.setRange(xRange=(0, width), yRange=(0, min(mosaic.shape[0], 4 * pitch)),
+                                padding=0)
+        self._update_mosaic_highlight()
+
+    def _on_mosaic_clicked(self, ev):
+        if self.mosaic_pitch is None:
+            return
+        mp = self.mosaic_vb.mapSceneToView(ev.scenePos())
+        idx = int(mp.y() // self.mosaic_pitch)
+        if 0 <= idx < self.n_slices and mp.y() - idx * self.mosaic_pitch < self.mosaic_tile_rows:
+            self.slice_selected.emit(idx)
+
+    def _update_mosaic_highlight(self):
+        if self.highlight_idx is None or self.mosaic_pitch is None:
+            self.mosaic_highlight.setVisible(False)
+            return
+        width = self.mosaic_img.width() or 0
+        self.mosaic_highlight.setRect(0, self.highlight_idx * self.mosaic_pitch,
+                                      width, self.mosaic_tile_rows)
+        self.mosaic_highlight.setVisible(True)
+
+    #####################################################################
+    # Virtualization
+    #####################################################################
+    def _visible_range(self):
+        row_pitch = self.row_height + self.row_spacing
+        top = self.scroll_area.verticalScrollBar().value()
+        height = self.scroll_area.viewport().height()
+        first = max(0, top // row_pitch)
+        last = min(self.n_slices, (top + height) // row_pitch + 1)
+        return first, last
+
+    def _update_visible(self):
+        """Bind pooled widgets to the slices currently inside the viewport."""
+        if self.dataset is None or self._mosaic_shown():
+            return
+        first, last = self._visible_range()
+        wanted = list(range(first, last))
+        while len(self.plot_widgets) < len(wanted):
+            self._add_pool_widget()
+
+        # keep widgets already showing a wanted slice, recycle the rest
+        kept = {idx: i for i, idx in enumerate(self.bound_idx) if idx in wanted}
+        free = [i for i in range(len(self.plot_widgets)) if i not in kept.values()]
+        width = self.container_widget.width()
+        row_pitch = self.row_height + self.row_spacing
+        for idx in wanted:
+            i = kept.get(idx)
+            if i is None:
+                i = free.pop(0)
+                self._bind(i, idx)
+            self.plot_widgets[i].setGeometry(0, idx * row_pitch, width, self.row_height)
+            self.plot_widgets[i].show()
+        for i in free:
+            self._unbind(i)
+
+    def _add_pool_widget(self):
+        i = len(self.plot_widgets)
+        plot_widget = pg.PlotWidget(parent=self.container_widget)
+        plot_widget.setBackground('w')
+        plot_item = plot_widget.getPlotItem()
+        plot_item.setLabel('bottom', 'frequency', units='Hz')
+        plot_item.setLabel('left', 'cable distance', units='m')
+
+        img_item = pg.ImageItem(axisOrder='row-major')
+        img_item.setLookupTable(PLOTCOLOR_LUT)
+        plot_widget.addItem(img_item)
+
+        plot_widget.scene().sigMouseClicked.connect(
+            lambda evt, i=i: self._on_widget_clicked(i)
+        )
+        plot_widget.hide()
+        self.plot_widgets.append(plot_widget)
+        self.plot_img_items.append(img_item)
+        self.bound_idx.append(None)
+        self.widget_rois.append([])
+
+    def _on_widget_clicked(self, i):
+        if self.bound_idx[i] is not None:
+            self.slice_selected.emit(self.bound_idx[i])
+
+    def _bind(self, i, idx):
+        """Show slice `idx` on pooled widget `i`."""
+        amp = self.dataset["amp"]
+        freq = self.dataset["freq"]
+        x = self.dataset["x"]
+        times = self.dataset["t"]
+
+        img_data = amp[idx, :, :]
+        if self.use_db:
+            img_data = 20*np.log10(np.maximum(img_data, 1e-12))
+        img_item = self.plot_img_items[i]
+        img_item.setImage(img_data, levels=self.levels, autoLevels=False)
+
+        # Coordinate transform
+        f0, f1 = freq[0], freq[-1]
+        x0 = x[0]
+        width = img_data.shape[1]
+        tr = pg.QtGui.QTransform()
+        # translate first: the offset is in plot units, not in image pixels
+        tr.translate(f0, x0)
+        tr.scale((f1 - f0) / width, self.data_manager.h5settings['dx'])
+        img_item.setTransform(tr)
+
+        plot_widget = self.plot_widgets[i]
+        plot_widget.getPlotItem().setTitle(f"T = {times[idx]:.2f} s")
+        plot_widget.setStyleSheet("border: 3px solid red;" if idx == self.highlight_idx else "")
+        self.bound_idx[i] = idx
+        self._draw_rois(i)
+
+    def _unbind(self, i):
+        self.plot_widgets[i].hide()
+        self._remove_rois(i)
+        self.bound_idx[i] = None
+
+    def _widget_for_slice(self, idx):
+        try:
+            return self.bound_idx.index(idx)
+        except ValueError:
+            return None
 
     def highlight_slice(self, idx):
-        if self.highlight_idx is not None:
-            self.plot_widgets[self.highlight_idx].setStyleSheet("")
-        self.plot_widgets[idx].setStyleSheet("border: 3px solid red;")
         self.highlight_idx = idx
+        for i, bound in enumerate(self.bound_idx):
+            self.plot_widgets[i].setStyleSheet("border: 3px solid red;" if bound == idx else "")
+        self._update_mosaic_highlight()
+
+    #####################################################################
+    # Annotation ROIs
+    #####################################################################
+    def _draw_rois(self, i):
+        """Draw the stored ROIs of the slice bound to widget `i`."""
+        self._remove_rois(i)
+        idx = self.bound_idx[i]
+        coords_list = getattr(self.data_manager, "annotation_rois_per_slice", {}).get(idx, [])
+        plot_item = self.plot_widgets[i].getPlotItem()
+        for k, (fmin, dmin, fmax, dmax) in enumerate(coords_list):
+            roi = pg.RectROI(
+                [fmin, dmin], [fmax - fmin, dmax - dmin],
+                pen={'color': 'r', 'width': 2},
+                movable=True, resizable=True
+            )
+            roi.sigRegionChanged.connect(lambda r, idx=idx, k=k: self._store_roi(idx, k, r))
+            plot_item.addItem(roi)
+            self.widget_rois[i].append(roi)
+
+    def redraw_slice_rois(self, idx):
+        """
+        Redraw the ROIs of slice `idx` after boxes were added to or deleted from its
+        stored list elsewhere: the drawn ROIs write back by list position.
+        """
+        i = self._widget_for_slice(idx)
+        if i is not None:
+            self._draw_rois(i)
+
+    def _remove_rois(self, i):
+        plot_item = self.plot_widgets[i].getPlotItem()
+        for roi in self.widget_rois[i]:
+            plot_item.removeItem(roi)
+        self.widget_rois[i] = []
+
+    def _store_roi(self, idx, k, roi):
+        """Write a moved/resized ROI back to the per-slice store."""
+        coords_list = self.data_manager.annotation_rois_per_slice.get(idx, [])
+        if k < len(coords_list):
+            pos, size = roi.pos(), roi.size()
+            coords_list[k] = (pos.x(), pos.y(), pos.x() + size[0], pos.y() + size[1])
 
     def add_adjustable_rois_to_all(self, box_coords, tx_contour_points):
         """
@@ -122,7 +328,6 @@ class FXSeriesPanel(QWidget):
         If contour has multiple separate vertical sections in the window,
         make one ROI per section.
         """
-        self.fx_rois.clear()
         dataset = self.data_manager.fx_manager.get_dataset()
         times = np.array(dataset["t"])  # FX slice start times
         win_s = self.data_manager.get_user_settings('win_s') or 2.0
@@ -144,7 +349,7 @@ class FXSeriesPanel(QWidget):
         if not hasattr(self.data_manager, "annotation_rois_per_slice"):
             self.data_manager.annotation_rois_per_slice = {}
 
-        for idx, plot_widget in enumerate(self.plot_widgets):
+        for idx in range(self.n_slices):
             # FX slice time window
             t_start = times[idx]
             t_end = t_start + win_s
@@ -171,40 +376,73 @@ class FXSeriesPanel(QWidget):
 
                 # Position ROI so vertical center is mean_dist
                 roi_y = mean_dist - h / 2
-
-                roi = pg.RectROI(
-                    [freq_min, roi_y],  # x = freq_min, y = distance start
-                    [w, h],             # width = frequency span, height = distance span
-                    pen={'color': 'r', 'width': 2},
-                    movable=True, resizable=True
-                )
-                plot_widget.getPlotItem().addItem(roi)
-                self.fx_rois.append(roi)
-
-                # Save coordinates for this ROI
                 slice_coords.append((freq_min, roi_y, freq_min + w, roi_y + h))
 
             # Store all ROI coords for this slice index
             if slice_coords:
                 self.data_manager.annotation_rois_per_slice[idx] = slice_coords
 
-    def get_all_rois_coordinates(self):
+        self.showing_rois = True
+        if self.use_mosaic:
+            # the mosaic has no per-slice plots to draw the ROIs on: switch to the list,
+            # which draws them while binding the visible slices
+            self.set_plot_data(self.dataset)
+            return
+        # draw them on the slices currently on screen
+        for i, idx in enumerate(self.bound_idx):
+            if idx is not None:
+                self._draw_rois(i)
+
+    def get_rois_by_slice(self):
         """
-        Get list of (freq_min, dist_min, freq_max, dist_max) for each adjustable ROI.
+        Get (slice index, (freq_min, dist_min, freq_max, dist_max)) for each
+        adjustable ROI, in slice order.
         """
-        coords = []
-        for roi in self.fx_rois:
-            pos = roi.pos()
-            size = roi.size()
-            coords.append((
-                pos.x(),
-                pos.y(),
-                pos.x() + size[0],
-                pos.y() + size[1]
-            ))
-        return coords
-    
+        rois_per_slice = getattr(self.data_manager, "annotation_rois_per_slice", {})
+        return [(idx, coords) for idx in sorted(rois_per_slice)
+                for coords in rois_per_slice[idx]]
+
     def clear_annotation_overlays(self):
-        for roi in self.fx_rois:
-            roi.scene().removeItem(roi)
-        self.fx_rois = []
\ No newline at end of file
+        for i in range(len(self.plot_widgets)):
+            self._remove_rois(i)
+        if self.showing_rois:
+            self.showing_rois = False
+            if self.use_mosaic:
+                self.set_plot_data(self.dataset)  # back to the mosaic
+
+
+
+def render_fx_mosaic(amp, levels, use_db, lut, max_tile_rows=150, gap=4):
+    """
+    Render a stack of FX slices into one RGBA uint8 image, tiles top to bottom.
+
+    Each tile is max-decimated along distance to at most `max_tile_rows` rows
+    (so narrow features stay visible), scaled to `levels` and colour-mapped
+    with `lut`. Tiles are flipped so distance increases upward, as in the
+    plot view, and separated by `gap` white rows.
+
+    Returns:
+    --------
+    mosaic : (n_slices * pitch - gap, nfreq, 4) uint8
+    pitch : int, rows from one tile start to the next
+    tile_rows : int, rows per tile
+    """
+    n_slices, nx, nfreq = amp.shape
+    factor = int(np.ceil(nx / max_tile_rows))
+    tile_rows = int(np.ceil(nx / factor))
+    pitch = tile_rows + gap
+    mosaic = np.full((max(n_slices * pitch - gap, 0), nfreq, 4), 255, dtype=np.uint8)
+    lo, hi = levels
+    scale = 255 / max(hi - lo, 1e-12)
+    for i in range(n_slices):
+        tile = amp[i]
+        if factor > 1:
+            pad = tile_rows * factor - nx
+            if pad:
+                tile = np.concatenate([tile, np.repeat(tile[-1:], pad, axis=0)])
+            tile = tile.reshape(tile_rows, factor, nfreq).max(axis=1)
+        if use_db:
+            tile = 20*np.log10(np.maximum(tile, 1e-12))
+        lut_idx = np.clip((tile - lo) * scale, 0, 255).astype(np.uint8)
+        mosaic[i * pitch:i * pitch + tile_rows] = lut[lut_idx[::-1]]
+    return mosaic, pitch, tile_rows
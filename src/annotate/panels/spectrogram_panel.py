@@ -1,14 +1,17 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout
 from PyQt6.QtGui import QPen
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 import pyqtgraph as pg
-from annotate.config import PLOTCOLOR_LUT, UserSettings
+from annotate.config import PLOTCOLOR_LUT, UserSettings, HOVER_FRAME_BUDGET_MS
+from collections import deque
 import numpy as np
+import time
 
 class SpectrogramPanel(QWidget):
     """
     Spectrogram panel shows frequency vs time for a single row of TX or FX data.
     """
+    hover_latency_report = pyqtSignal(str)  # periodic summary while in hover mode
 
     def __init__(self, data_manager):
         super().__init__()
@@ -18,6 +21,16 @@ class SpectrogramPanel(QWidget):
         self.use_db = False
         self.last_row_idx = None  # will be set on first click
 
+        # Hover mode: mouse moves are coalesced to at most one update per frame
+        self.hover_budget_ms = HOVER_FRAME_BUDGET_MS
+        self.hover_monitor = LatencyMonitor(self.hover_budget_ms)
+        self._hover_pending_row = None
+        self._hover_last_update = 0.0
+        self._hover_timer = QTimer(self)
+        self._hover_timer.setSingleShot(True)
+        self._hover_timer.timeout.connect(self._render_hover_row)
+        self._image_geometry = None  # (shape, f0, f1, t0, t1) of the displayed image
+
         self.data_manager.settings_changed.connect(self.on_settings_changed)
 
         # Layout and single plot
@@ -51,6 +64,9 @@ class SpectrogramPanel(QWidget):
             row_idx = self.last_row_idx
         else:
             self.last_row_idx = row_idx
+        if row_idx >= self.data_manager.loaded_data['amp'].shape[0]:
+            self.last_row_idx = None  # channel range changed since the row was picked
+            return
 
         self.update_settings()
 
@@ -68,21 +84,74 @@ class SpectrogramPanel(QWidget):
         # Debug output to help tune sliders
         print(f"SPECTROGRAM: vmin={self.vmin}, vmax={self.vmax}, data min={np.min(Sxx)}, data max={np.max(Sxx)}")
 
-        self.img_item.setImage(Sxx, levels=levels)
+        self._set_image(freqs, times, Sxx, levels)
+
+        dist_val = self.data_manager.loaded_data['x'][row_idx]
+        self.plot_widget.setTitle(f"Spectrogram (row {row_idx}: {dist_val:.2f} m)")
+
+    def _set_image(self, freqs, times, Sxx, levels):
+        self.img_item.setImage(Sxx, levels=levels, autoLevels=False)
         self.img_item.setVisible(True)
 
-        # Transform coords for correct frequency/time axes
+        # Transform coords for correct frequency/time axes (only when they change)
         f0, f1 = freqs[0], freqs[-1]
         t0, t1 = times[0], times[-1]
+        geometry = (Sxx.shape, f0, f1, t0, t1)
+        if geometry == self._image_geometry:
+            return
         width = Sxx.shape[1]
         height = Sxx.shape[0]
         tr = pg.QtGui.QTransform()
         tr.scale((t1 - t0) / width, (f1 - f0) / height)
         tr.translate(t0, f0)
         self.img_item.setTransform(tr)
+        self._image_geometry = geometry
 
+    #####################################################################
+    # Hover mode
+    #####################################################################
+    def start_hover_mode(self):
+        """Enter hover mode: precompute all rows of the window so updates are lookups."""
+        self.update_settings()
+        self.hover_monitor.reset()
+        self.data_manager.spectrogram_manager.start_stack_job()
+
+    def hover_row(self, row_idx):
+        """Mouse is over `row_idx`; update now or at the next frame, keeping only the latest row."""
+        if self._hover_pending_row is not None and self._hover_pending_row != row_idx:
+            self.hover_monitor.coalesced += 1  # the pending row is dropped without being drawn
+        self._hover_pending_row = row_idx
+        if self._hover_timer.isActive():
+            return
+        elapsed_ms = (time.perf_counter() - self._hover_last_update) * 1000
+        self._hover_timer.start(int(max(0, self.hover_budget_ms - elapsed_ms)))
+
+    def _render_hover_row(self):
+        row_idx = self._hover_pending_row
+        self._hover_pending_row = None
+        self._hover_last_update = time.perf_counter()
+        if row_idx is None or row_idx == self.last_row_idx:
+            return
+        if self.data_manager.loaded_data['amp'] is None:
+            return
+        start = time.perf_counter()
+
+        self.last_row_idx = row_idx
+        freqs, times, Sxx = self.data_manager.spectrogram_manager.calc_spectrogram(row_idx)
+        levels = (self.vmin, self.vmax)
+        if self.use_db:
+            Sxx = 20 * np.log10(np.maximum(Sxx, 1e-12))
+        self._set_image(freqs, times, Sxx, levels)
         dist_val = self.data_manager.loaded_data['x'][row_idx]
-        self.plot_widget.setTitle(f"Spectrogram (row {row_idx}: {dist_val:.2f} m)")
+        self.plot_widget.setTitle(f"Spectrogram (hover row {row_idx}: {dist_val:.2f} m)")
+        # pyqtgraph applies the colour map when the image is painted: paint now, so the
+        # measured time is the whole frame and not just handing the array over
+        self.plot_widget.viewport().repaint()
+
+        report = self.hover_monitor.record((time.perf_counter() - start) * 1000,
+                                           self.data_manager.spectrogram_manager.has_stack())
+        if report:
+            self.hover_latency_report.emit(report)
 
     def on_settings_changed(self):
         self.update_settings()
@@ -119,4 +188,41 @@ class SpectrogramPanel(QWidget):
         self.plot_widget.addItem(line1)
         self.plot_widget.addItem(line2)
 
-        self.highlight_lines = [line1, line2]
\ No newline at end of file
+        self.highlight_lines = [line1, line2]
+
+
+class LatencyMonitor:
+    """Rolling update-time statistics against a per-update budget (ms)."""
+
+    def __init__(self, budget_ms, window=240, report_every=30):
+        self.budget_ms = budget_ms
+        self.report_every = report_every
+        self.durations = deque(maxlen=window)
+        self.coalesced = 0   # mouse moves replaced by a later one before rendering
+        self._count = 0
+
+    def reset(self):
+        self.durations.clear()
+        self.coalesced = 0
+        self._count = 0
+
+    def record(self, duration_ms, from_stack=True):
+        """Store one update; return a summary string every `report_every` updates."""
+        self.durations.append(duration_ms)
+        self._count += 1
+        if self._count % self.report_every:
+            return None
+        return self.summary(from_stack)
+
+    def summary(self, from_stack=True):
+        if not self.durations:
+            return "Hover: no updates yet"
+        d = np.fromiter(self.durations, dtype=float)
+        within = 100 * np.mean(d <= self.budget_ms)
+        status = "OK" if np.percentile(d, 95) <= self.budget_ms else "OVER BUDGET"
+        source = "" if from_stack else " (all-channel stack not ready)"
+        return (f"Hover: {status}{source}\n"
+                f"mean {d.mean():.1f} ms, p95 {np.percentile(d, 95):.1f} ms, "
+                f"max {d.max():.1f} ms\n"
+                f"{within:.0f}% within {self.budget_ms:.0f} ms, "
+                f"{self.coalesced} moves coalesced")
@@ -1,15 +1,15 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout
 from PyQt6.QtGui import QPen
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 import pyqtgraph as pg
 import numpy as np
-import scipy.signal as sp
 from annotate.config import PLOTCOLOR_LUT, UserSettings
 
 
 class TXPlotPanel(QWidget):
     point_clicked = pyqtSignal(int, int)  # Emits (row index, col index)
     label_delete_requested = pyqtSignal(int)      # Emits tx_id for DB deletion
+    row_hovered = pyqtSignal(int)         # Emits row index under the mouse in hover mode
 
     def __init__(self, data_manager):
         super().__init__()
@@ -36,6 +36,20 @@ class TXPlotPanel(QWidget):
         self.img_item.setVisible(False)
         self.plot_widget.addItem(self.img_item)
 
+        # Level-of-detail display: only the visible part of the image, at the
+        # decimation that matches the on-screen size, is handed to the ImageItem
+        self.pyramid = None
+        self._pyramid_key = None  # data the pyramid was built from
+        self.levels = None
+        self._origin = None      # (t0, x0) of sample (0, 0)
+        self._pixel_size = None  # (dt, dx) of one full-resolution sample
+        self._extent = None
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.setInterval(15)
+        self._render_timer.timeout.connect(self._render_view)
+        plot_item.getViewBox().sigRangeChanged.connect(lambda *args: self._render_timer.start())
+
         # Annotation points
         self.annotation_points_list = []    # list of (time, dist)
         self.annotation_points_item = None
@@ -47,6 +61,7 @@ class TXPlotPanel(QWidget):
 
         # Mouse click connection
         self.plot_widget.scene().sigMouseClicked.connect(self._plot_scene_click)
+        self.plot_widget.scene().sigMouseMoved.connect(self._plot_scene_hover)
 
     #####################################################################
     # Data Manager events
@@ -63,18 +78,60 @@ class TXPlotPanel(QWidget):
             return
 
         amp, t_vec, x_vec = dataset['amp'], dataset['t'], dataset['x']
-        levels = (self.vmin, self.vmax) if self.vmin is not None else (np.nanmin(amp), np.nanmax(amp))
-        amp = np.clip(amp, self.vmin, self.vmax)
-
-        self.img_item.setImage(amp, levels=levels)
-        t0, t1 = t_vec[0], t_vec[-1]
-        x0, x1 = x_vec[0], x_vec[-1]
+        # levels clip the colour map, so the data itself is not clipped/copied
+        self.levels = (self.vmin, self.vmax) if self.vmin is not None else (np.nanmin(amp), np.nanmax(amp))
+        # colour level changes only re-render; the pyramid is rebuilt for new data
+        key = (self.data_manager.window_generation, id(amp), amp.shape)
+        if key != self._pyramid_key:
+            self.pyramid = LODPyramid(amp)
+            self._pyramid_key = key
+
+        t0, x0 = t_vec[0], x_vec[0]
         width, height = amp.shape[1], amp.shape[0]
+        self._origin = (t0, x0)
+        # from the sampling, not the extent: a window can hold a single channel
+        dt, dx = 1 / self.data_manager.h5settings['fs'], self.data_manager.h5settings['dx']
+        self._pixel_size = (dt, dx)
+        t1, x1 = t0 + width * dt, x0 + height * dx
+        if (t0, t1, x0, x1) != self._extent:
+            # new window extent: show all of it (otherwise keep the user's zoom)
+            self._extent = (t0, t1, x0, x1)
+            self.plot_widget.getPlotItem().getViewBox().setRange(xRange=(t0, t1), yRange=(x0, x1))
+        self._render_view()
+        self.img_item.setVisible(True)
+
+    def _render_view(self):
+        """Show the visible region at the coarsest pyramid level that still fills the screen."""
+        if self.pyramid is None:
+            return
+        vb = self.plot_widget.getPlotItem().getViewBox()
+        (vt0, vt1), (vx0, vx1) = vb.viewRange()
+        nx, nt = self.pyramid.shape
+        t0, x0 = self._origin
+        dt, dx = self._pixel_size
+
+        # visible samples (plus a margin for panning) at full resolution
+        margin_t, margin_x = 0.25 * (vt1 - vt0), 0.25 * (vx1 - vx0)
+        c0 = int(np.clip(np.floor((vt0 - margin_t - t0) / dt), 0, nt))
+        c1 = int(np.clip(np.ceil((vt1 + margin_t - t0) / dt), 0, nt))
+        r0 = int(np.clip(np.floor((vx0 - margin_x - x0) / dx), 0, nx))
+        r1 = int(np.clip(np.ceil((vx1 + margin_x - x0) / dx), 0, nx))
+        if c1 <= c0 or r1 <= r0:
+            return
+
+        # samples per screen pixel along each axis -> decimation level
+        width_px, height_px = max(vb.width(), 1), max(vb.height(), 1)
+        kt = int(max(0, np.floor(np.log2(max((vt1 - vt0) / dt / width_px, 1)))))
+        kx = int(max(0, np.floor(np.log2(max((vx1 - vx0) / dx / height_px, 1)))))
+        img, (fx, ft) = self.pyramid.get(kx, kt)
+        lr0, lr1 = r0 // fx, -(-r1 // fx)
+        lc0, lc1 = c0 // ft, -(-c1 // ft)
+
+        self.img_item.setImage(img[lr0:lr1, lc0:lc1], levels=self.levels, autoLevels=False)
         tr = pg.QtGui.QTransform()
-        tr.scale((t1 - t0) / width, (x1 - x0) / height)
-        tr.translate(t0, x0)
+        tr.translate(t0 + lc0 * ft * dt, x0 + lr0 * fx * dx)
+        tr.scale(ft * dt, fx * dx)
         self.img_item.setTransform(tr)
-        self.img_item.setVisible(True)
 
     def on_settings_changed(self):
         self.update_settings()
@@ -85,12 +142,12 @@ class TXPlotPanel(QWidget):
         self.vmax = self.data_manager.get_user_settings('tx_vmax') / 100
 
     def update_plot(self):
-        amp = self.data_manager.loaded_data['amp']
-        if amp is None:
+        # envelope is computed once per window by the data manager
+        env = self.data_manager.loaded_data['env']
+        if env is None:
             return
-        amp = np.abs(sp.hilbert(amp, axis=1))
         self.set_plot_data({
-            "amp": amp,
+            "amp": env,
             "t": self.data_manager.loaded_data['t'],
             "x": self.data_manager.loaded_data['x']
         })
@@ -307,6 +364,13 @@ class TXPlotPanel(QWidget):
                     return
             
 
+    def _plot_scene_hover(self, scene_pos):
+        if self.data_manager.cursor_mode != 'h' or self.data_manager.loaded_data['x'] is None:
+            return
+        mp = self.plot_widget.getPlotItem().vb.mapSceneToView(scene_pos)
+        x_vec = self.data_manager.loaded_data['x']
+        self.row_hovered.emit(int(np.argmin(np.abs(x_vec - mp.y()))))
+
     #####################################################################
     # Apex
     #####################################################################
@@ -351,4 +415,45 @@ class TXPlotPanel(QWidget):
         min_x, max_x = min(pts_x), max(pts_x)
         mask = (all_x >= min_x) & (all_x <= max_x)
         interp_t = np.interp(all_x[mask], pts_x, pts_t)
-        return list(zip(interp_t, all_x[mask]))
\ No newline at end of file
+        return list(zip(interp_t, all_x[mask]))
+
+
+class LODPyramid:
+    """
+    Peak-preserving decimations of a 2D image by powers of two along each axis.
+
+    Level (kx, kt) is the max over 2**kx rows by 2**kt columns, so short or
+    narrow arrivals survive when zoomed out. Levels are built on first use
+    from the nearest finer level and kept for the lifetime of the window.
+    """
+
+    def __init__(self, data):
+        self.shape = data.shape
+        self._levels = {(0, 0): data}
+
+    def get(self, kx, kt):
+        """Return (image, (row factor, column factor)) for level (kx, kt)."""
+        # never decimate an axis below one sample
+        kx = min(kx, int(np.ceil(np.log2(max(self.shape[0], 1)))))
+        kt = min(kt, int(np.ceil(np.log2(max(self.shape[1], 1)))))
+        if (kx, kt) not in self._levels:
+            if kt > 0:
+                parent = self.get(kx, kt - 1)[0]
+                self._levels[(kx, kt)] = _max_halve(parent, axis=1)
+            else:
+                parent = self.get(kx - 1, kt)[0]
+                self._levels[(kx, kt)] = _max_halve(parent, axis=0)
+        return self._levels[(kx, kt)], (2 ** kx, 2 ** kt)
+
+
+def _max_halve(data, axis):
+    """Max of neighbouring pairs along `axis` (an odd last sample is kept as is)."""
+    n = data.shape[axis]
+    if n < 2:
+        return data
+    even = np.take(data, np.arange(0, n - 1, 2), axis=axis)
+    odd = np.take(data, np.arange(1, n, 2), axis=axis)
+    halved = np.maximum(even, odd)
+    if n % 2:
+        halved = np.concatenate([halved, np.take(data, [n - 1], axis=axis)], axis=axis)
+    return halved
@@ -0,0 +1,201 @@
+"""
+Rehydration of many files at once in worker processes.
+
+Kept free of Qt (and of data_manager), so spawned workers only import numpy,
+data_io and, on first use, scipy and h5py.
+"""
+
+import os
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from . import data_io as io
+from .config import H5_MAX_OPEN_FILES, REHYDRATE_PROCESSES
+
+
+class SharedArray:
+    """
+    numpy array in `multiprocessing.shared_memory`.
+
+    Pickles as its name, shape and dtype, so passing one to a worker process
+    attaches to the same memory instead of copying the data. The creating
+    process calls `unlink()` when done; workers call `close()`.
+    """
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = np.dtype(dtype)
+        self._owner = name is None
+        nbytes = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        self.shm = shared_memory.SharedMemory(name=name, create=self._owner,
+                                              size=nbytes if self._owner else 0)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    def __reduce__(self):
+        return (SharedArray, (self.shape, self.dtype.str, self.shm.name))
+
+    def close(self):
+        self.array = None  # drop the view, or the buffer can't be released
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+class ParallelRehydrator:
+    """
+    Rehydrate many files at once in worker processes.
+
+    Workers read, rehydrate and filter one file each and write the requested
+    samples straight into shared-memory output arrays, so only the task
+    description travels between processes. With a `DiskFileCache`, workers
+    read cached files from it and add the files they rehydrate.
+
+    Spawning the workers and their imports take seconds, so interactive use
+    calls `start()` (in the background) when a window first needs several
+    files and only hands work to the pool once `ready()`; batch jobs can call
+    `rehydrate_files` directly, which starts the pool on first use. Workers
+    are spawned, so they re-import the main module: scripts that use the pool
+    must keep their top-level code under `if __name__ == "__main__":`.
+    """
+    def __init__(self, workers=REHYDRATE_PROCESSES):
+        self.workers = workers
+        self._executor = None
+        self._warm_ups = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker processes without blocking; no-op if already started."""
+        if self.workers <= 1:
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            executor = self._executor = self._new_executor()
+        # submitting spawns the processes, so do that off the calling (GUI) thread too
+        threading.Thread(target=self._warm_up, args=(executor,), daemon=True,
+                         name='rehydrate-pool-start').start()
+
+    def ready(self):
+        """True once every worker has started and imported what rehydration needs."""
+        with self._lock:
+            warm_ups = list(self._warm_ups)
+        return (self._executor is not None and len(warm_ups) == self.workers
+                and all(job.done() and job.exception() is None for job in warm_ups))
+
+    def rehydrate_pieces(self, settings_filepath, pieces, options, n_rows, n_cols, disk_cache=None):
+        """
+        pieces : list of (filepath, first sample in file, n samples, output column),
+            optionally followed by the file's `disk_cache` key (None = not cached)
+        options : keyword arguments of `load_and_rehydrate_h5` (cutoff_hz, lowpass,
+            dtype, x_min_m, x_max_m)
+
+        Returns {'amp': SharedArray, 'env': SharedArray} of shape (n_rows, n_cols);
+        the caller unlinks them.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            executor = self._executor
+        dtype = np.dtype(options.get('dtype', np.float64))
+        targets = {name: SharedArray((n_rows, n_cols), dtype) for name in ('amp', 'env')}
+        try:
+            jobs = []
+            for piece in pieces:
+                filepath, local, n, column = piece[:4]
+                disk_key = piece[4] if len(piece) > 4 else None
+                jobs.append(executor.submit(_rehydrate_piece_job, settings_filepath, filepath,
+                                            options, local, n, targets, column,
+                                            disk_cache, disk_key))
+            for job in jobs:
+                job.result()
+        except Exception:
+            for target in targets.values():
+                target.unlink()
+            raise
+        return targets
+
+    def rehydrate_files(self, settings_filepath, filepaths, options):
+        """Whole files side by side in time, for batch jobs (see `rehydrate_pieces`)."""
+        settings = io.load_settings_preprocessed_h5(settings_filepath)
+        nx, ns = settings['rehydration_info']['target_shape']
+        channels = io.channel_slice(nx, settings['processing_settings']['dx'],
+                                    options.get('x_min_m'), options.get('x_max_m'))
+        pieces = [(filepath, 0, int(ns), i * int(ns)) for i, filepath in enumerate(filepaths)]
+        return self.rehydrate_pieces(settings_filepath, pieces, options,
+                                     channels.stop - channels.start, len(filepaths) * int(ns))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._warm_ups = []
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_lower_priority)
+
+    def _warm_up(self, executor):
+        try:
+            jobs = [executor.submit(_warm_up_job) for _ in range(self.workers)]
+        except RuntimeError:
+            return  # shut down before the workers were started
+        with self._lock:
+            if self._executor is executor:
+                self._warm_ups = jobs
+
+
+_worker_state = {}  # per worker process: rehydration plan and open files of the current dataset
+
+
+def _lower_priority():
+    """Worker process: yield the CPU to the GUI (imports, long loads) where the OS allows it."""
+    if hasattr(os, 'nice'):
+        os.nice(10)
+
+
+def _warm_up_job():
+    """Worker process: import the lazily imported modules before real work arrives."""
+    import h5py  # noqa: F401
+    import scipy.fft  # noqa: F401
+    import scipy.signal  # noqa: F401
+
+
+def _rehydrate_piece_job(settings_filepath, filepath, options, local, n, targets, column,
+                         disk_cache=None, disk_key=None):
+    """
+    Worker process: rehydrate `filepath` (or read it from `disk_cache`) and copy
+    samples [local, local + n) to `column`.
+    """
+    if _worker_state.get('settings_filepath') != settings_filepath:
+        settings = io.load_settings_preprocessed_h5(settings_filepath)
+        nx, ns = settings['rehydration_info']['target_shape']
+        h5settings = {'fs': settings['processing_settings']['fs'],
+                      'dx': settings['processing_settings']['dx'], 'nx': nx, 'ns': ns}
+        h5_pool = _worker_state.get('h5_pool') or io.H5HandlePool(max_open=H5_MAX_OPEN_FILES)
+        h5_pool.set_directory(os.path.dirname(os.path.abspath(settings_filepath)))
+        _worker_state.update(
+            settings_filepath=settings_filepath, h5settings=h5settings, h5_pool=h5_pool,
+            plan=io.SparseRehydrator(settings['rehydration_info']['nonzeros_mask'],
+                                     (nx, ns), scale=1e9))
+    h5settings = _worker_state['h5settings']
+    options = dict(options)
+    channels = io.channel_slice(h5settings['nx'], h5settings['dx'],
+                                options.pop('x_min_m', None), options.pop('x_max_m', None))
+    hit = disk_cache.get(disk_key) if disk_key is not None else None
+    if hit is not None:
+        amp, env, _ = hit
+    else:
+        amp, timestamp, env = io.rehydrate_h5(filepath, _worker_state['plan'], h5settings, channels,
+                                              envelope=True, h5_pool=_worker_state['h5_pool'],
+                                              **options)
+        if disk_key is not None:
+            disk_cache.put(disk_key, amp, env, timestamp)
+    for name, data in (('amp', amp), ('env', env)):
+        targets[name].array[:, column:column + n] = data[:, local:local + n]
+        targets[name].close()
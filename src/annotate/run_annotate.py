@@ -1,2 +1,5 @@
 import annotate.main
-annotate.main.run()
\ No newline at end of file
+
+# rehydration worker processes re-import this module, so don't start the GUI on import
+if __name__ == "__main__":
+    annotate.main.run()